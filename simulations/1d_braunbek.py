@@ -3,6 +3,9 @@ import magpylib as magpy
 import matplotlib.pyplot as plt
 from math import sqrt
 
+from coilsystem import CoilSystem
+from fieldlines import plot_field_lines
+
 # From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
 
 # Set some parameters for the design
@@ -51,19 +54,8 @@ print(f"Field in center: {magpy.getB(braunbek, [0, 0, 0])}")
 
 fig, ax = plt.subplots(1, 1, figsize=(6,5))
 
-# Compute field and plot the coil pair field on yz-grid
-grid = np.mgrid[0:0:1j, -0.5:0.5:20j, -0.5:0.5:20j].T[:,:,0]
-_, Y, Z = np.moveaxis(grid, 2, 0)
-
-B = magpy.getB(braunbek, grid)
-_, By, Bz = np.moveaxis(B, 2, 0)
-
-Bamp = np.linalg.norm(B, axis=2)
-Bamp /= np.amax(Bamp)
-
-sp = ax.streamplot(Y, Z, By, Bz, density=5, color=Bamp,
-    linewidth=np.sqrt(Bamp)*3, cmap='coolwarm',
-)
+# Field lines of the coils, density 2 already fills the homogeneous centre
+plot_field_lines(ax, CoilSystem.from_magpy(braunbek), (0, -0.5, -0.5), (0, 0.5, 0.5), density=2)
 
 # Plot coil outline
 #from matplotlib.patches import Rectangle
@@ -77,7 +69,6 @@ ax.set(
     ylabel='z-position (m)',
     aspect=1,
 )
-plt.colorbar(sp.lines, ax=ax, label='(T)')
 
 
 
@@ -3,6 +3,11 @@ import magpylib as magpy
 import matplotlib.pyplot as plt
 from math import sqrt
 
+from cache import cached_getB
+from coilsystem import CoilSystem
+from fieldlines import plot_field_lines
+from homogeneity import compare
+
 # From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
 
 # Set some parameters for the design
@@ -65,6 +70,17 @@ helmholtz = magpy.Collection(coil5, coil6)
 print(f"Field in helmholtz: {magpy.getB(helmholtz, [0, 0, 0])}")
 helmholtz.show()
 
+# Size of the regions within 10/100/1000ppm of the centre field
+print()
+braunbek_system = CoilSystem.from_magpy(braunbek)
+helmholtz_system = CoilSystem.from_magpy(helmholtz)
+
+compare({
+    "braunbek": braunbek_system,
+    "helmholtz": helmholtz_system,
+})
+print()
+
 
 
 fig, axes = plt.subplots(1, 2, figsize=(6,5))
@@ -76,7 +92,8 @@ helmholtz_ax = axes[1]
 grid = np.mgrid[0:0:1j, -0.5:0.5:20j, -0.5:0.5:20j].T[:,:,0]
 _, Y, Z = np.moveaxis(grid, 2, 0)
 
-braunbek_B = magpy.getB(braunbek, grid)
+# cached across runs when COILS_CACHE_DIR is set, see cache.py
+braunbek_B = cached_getB(braunbek_system, grid)
 _, braunbek_By, braunbek_Bz = np.moveaxis(braunbek_B, 2, 0)
 
 braunbek_Bamp = np.linalg.norm(braunbek_B, axis=2)
@@ -95,7 +112,7 @@ braunbek_ax.set(
 )
 plt.colorbar(sp.lines, ax=braunbek_ax, label='(T)')
 
-helmholtz_B = magpy.getB(helmholtz, grid)
+helmholtz_B = cached_getB(helmholtz_system, grid)
 _, helmholtz_By, helmholtz_Bz = np.moveaxis(helmholtz_B, 2, 0)
 
 helmholtz_Bamp = np.linalg.norm(helmholtz_B, axis=2)
@@ -107,7 +124,7 @@ sp = helmholtz_ax.streamplot(Y, Z, helmholtz_By, helmholtz_Bz, density=2, color=
 
 # Figure styling
 helmholtz_ax.set(
-    title='Magnetic field of Braunbek',
+    title='Magnetic field of Helmholtz',
     xlabel='y-position (m)',
     ylabel='z-position (m)',
     aspect=1,
@@ -124,19 +141,9 @@ fig, axes = plt.subplots(1, 2, figsize=(6,5))
 braunbek_ax = axes[0]
 helmholtz_ax = axes[1]
 
-# Compute field and plot the coil pair field on yz-grid
-grid = np.mgrid[0:0:1j, -0.2:0.2:20j, -0.2:0.2:20j].T[:,:,0]
-_, Y, Z = np.moveaxis(grid, 2, 0)
-
-braunbek_B = magpy.getB(braunbek, grid)
-_, braunbek_By, braunbek_Bz = np.moveaxis(braunbek_B, 2, 0)
-
-braunbek_Bamp = np.linalg.norm(braunbek_B, axis=2)
-braunbek_Bamp /= np.amax(braunbek_Bamp)
-
-sp = braunbek_ax.streamplot(Y, Z, braunbek_By, braunbek_Bz, density=2, color=braunbek_Bamp,
-    linewidth=np.sqrt(braunbek_Bamp)*3, cmap='coolwarm',
-)
+# Field lines of both systems traced through the coil field
+plot_field_lines(braunbek_ax, braunbek_system, (0, -0.2, -0.2), (0, 0.2, 0.2), density=2)
+plot_field_lines(helmholtz_ax, helmholtz_system, (0, -0.2, -0.2), (0, 0.2, 0.2), density=5)
 
 # Figure styling
 braunbek_ax.set(
@@ -145,20 +152,8 @@ braunbek_ax.set(
     ylabel='z-position (m)',
     aspect=1,
 )
-
-helmholtz_B = magpy.getB(helmholtz, grid)
-_, helmholtz_By, helmholtz_Bz = np.moveaxis(helmholtz_B, 2, 0)
-
-helmholtz_Bamp = np.linalg.norm(helmholtz_B, axis=2)
-helmholtz_Bamp /= np.amax(helmholtz_Bamp)
-
-sp = helmholtz_ax.streamplot(Y, Z, helmholtz_By, helmholtz_Bz, density=5, color=helmholtz_Bamp,
-    linewidth=np.sqrt(helmholtz_Bamp)*3, cmap='coolwarm',
-)
-
-# Figure styling
 helmholtz_ax.set(
-    title='Magnetic field of Braunbek',
+    title='Magnetic field of Helmholtz',
     xlabel='y-position (m)',
     ylabel='z-position (m)',
     aspect=1,
@@ -0,0 +1,27 @@
+from coilsystem import ORIG_D1, braunbek
+from homogeneity import compare
+from optimize import optimize_braunbek
+
+# Re-optimise the Braunbek radii and outer spacing for our own constraints
+
+INNER_DISTANCE = 0.030 # [m] fixed position of the inner coils
+MAX_DIAMETER = 0.200 # [m] largest coil that fits
+
+optimized = optimize_braunbek(
+    fixed={"inner_distance": INNER_DISTANCE},
+    max_diameter=MAX_DIAMETER,
+)
+params = optimized["params"]
+
+print()
+print("Optimized design:")
+print(f"Outer coils: d={params['outer_diameter']*1000:.1f}mm positioned at +/-{params['outer_distance']*1000:.1f}mm")
+print(f"Inner coils: d={params['inner_diameter']*1000:.1f}mm positioned at +/-{params['inner_distance']*1000:.1f}mm")
+for n, c in optimized["coefficients"].items():
+    print(f"Order {n}: {c:+.3e}")
+print()
+
+compare({
+    "scaled GFZ": braunbek(INNER_DISTANCE/ORIG_D1),
+    "optimized": optimized["system"],
+})
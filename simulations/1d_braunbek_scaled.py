@@ -3,6 +3,10 @@ import magpylib as magpy
 import matplotlib.pyplot as plt
 from math import sqrt
 
+from coilsystem import CoilSystem
+from fieldlines import plot_field_lines
+from onaxis import axial_taylor, coaxial_loops
+
 # From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
 
 ORIG_R1 = 0.780 # diameter of inner coils
@@ -66,23 +70,17 @@ magpy.show({"objects":braunbek},
 
 print(f"Field in center: {magpy.getB(braunbek, [0, 0, 0])}")
 
+# Axial Taylor coefficients at the centre relative to the centre field, in
+# units of the inner coil distance. The lowest even orders should vanish.
+taylor = axial_taylor(*coaxial_loops(CoilSystem.from_magpy(braunbek)), order=8)
+for n in range(2, 9, 2):
+    print(f"Order {n}: {taylor[n] * D1**n / taylor[0]:+.3e}")
 
 
-fig, ax = plt.subplots(1, 1, figsize=(6,5))
-
-# Compute field and plot the coil pair field on yz-grid
-grid = np.mgrid[0:0:1j, -0.05:0.05:20j, -0.05:0.05:20j].T[:,:,0]
-_, Y, Z = np.moveaxis(grid, 2, 0)
-
-B = magpy.getB(braunbek, grid)
-_, By, Bz = np.moveaxis(B, 2, 0)
 
-Bamp = np.linalg.norm(B, axis=2)
-Bamp /= np.amax(Bamp)
+fig, ax = plt.subplots(1, 1, figsize=(6,5))
 
-sp = ax.streamplot(Y, Z, By, Bz, density=5, color=Bamp,
-    linewidth=np.sqrt(Bamp)*3, cmap='coolwarm',
-)
+plot_field_lines(ax, CoilSystem.from_magpy(braunbek), (0, -0.05, -0.05), (0, 0.05, 0.05), density=2)
 
 # Plot coil outline
 #from matplotlib.patches import Rectangle
@@ -96,7 +94,6 @@ ax.set(
     ylabel='z-position (m)',
     aspect=1,
 )
-plt.colorbar(sp.lines, ax=ax, label='(T)')
 
 
 
@@ -1,8 +1,10 @@
 import numpy as np
 import magpylib as magpy
-import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from animation import animation_figure, field_cone
+from field_basis import field_basis, superpose
+
 # From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
 
 ORIG_R1 = 0.780 # diameter of inner coils
@@ -61,28 +63,26 @@ coil4.add(winding4)
 
 braunbek = magpy.Collection(coil1, coil2, coil3, coil4)
 
-# Create a function to update the current and return the updated figure
-def update_figure(current):
-    for coil in braunbek.children:
-        for winding in coil.children:
-            winding.current = current
-    
-    fig = magpy.show(braunbek, backend='plotly', return_fig=True)
-    return fig
+# The coils stay where they are, only the field at the centre changes with the
+# current. With DELTA_FRAMES the coils are stored once and every frame only
+# holds the field cone.
+DELTA_FRAMES = True
+CENTER = (0, 0, 0)
 
-# Create frames for different current values
-currents = np.linspace(0.1, 2, 20)
-frames = [go.Frame(data=update_figure(current).data, name=f'current_{current:.2f}') for current in currents]
+# Current arrows are hidden, they would keep showing the initial current
+braunbek.set_children_styles(arrow_show=False)
+initial_fig = magpy.show(braunbek, backend='plotly', return_fig=True)
 
-# Create the initial figure
-initial_fig = update_figure(1)
+# The field is linear in the current, one evaluation at 1A is enough
+basis = field_basis([braunbek], CENTER)
 
-# Create the final figure with frames and slider
-fig = go.Figure(
-    data=initial_fig.data,
-    layout=initial_fig.layout,
-    frames=frames
-)
+# Create a function returning the traces that change with the current
+def center_traces(current):
+    return [field_cone(CENTER, superpose(basis, [current]))]
+
+# Create frames for different current values
+currents = np.linspace(0.1, 2, 20)
+frames = {f'current_{current:.2f}': dict(current=current) for current in currents}
 
 # Add slider
 sliders = [dict(
@@ -96,8 +96,18 @@ sliders = [dict(
     ) for current in currents]
 )]
 
-fig.update_layout(
+# Create the final figure, only frames the slider can reach are built
+fig = animation_figure(
+    static=initial_fig.data,
+    dynamic=center_traces,
+    frames=frames,
+    initial=dict(current=1),
+    layout=initial_fig.layout,
+    delta=DELTA_FRAMES,
     sliders=sliders,
+)
+
+fig.update_layout(
     title='Braunbek Coil Visualization',
     scene=dict(
         xaxis_title='X',
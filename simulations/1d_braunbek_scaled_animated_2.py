@@ -1,8 +1,9 @@
 import numpy as np
 import magpylib as magpy
-import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from animation import animation_figure
+
 # From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
 
 ORIG_R1 = 0.780 # diameter of inner coils
@@ -61,41 +62,43 @@ coil4.add(winding4)
 
 braunbek = magpy.Collection(coil1, coil2, coil3, coil4)
 
-# Create a function to update the current and position, and return the updated figure
-def update_figure(current, position_factor):
+# Only the outer coils move between frames. With DELTA_FRAMES the inner coils
+# are stored once and every frame only holds the outer coils.
+DELTA_FRAMES = True
+
+# All coils share one color, so the separately drawn inner and outer coils
+# look like the full system
+braunbek.set_children_styles(color="blue")
+outer_coils = [braunbek.children[0], braunbek.children[3]]
+inner_coils = [braunbek.children[1], braunbek.children[2]]
+
+# Create a function to update the current and position, and return the changing traces
+def outer_traces(current, position_factor):
     for coil in braunbek.children:
         for winding in coil.children:
             winding.current = current
-    
+
     # Update position of outer coils
     braunbek.children[0].children[0].position = (0, 0, D2 * position_factor)
     braunbek.children[3].children[0].position = (0, 0, -D2 * position_factor)
-    
-    fig = magpy.show(braunbek, backend='plotly', return_fig=True)
-    return fig
+
+    fig = magpy.show(*outer_coils, backend='plotly', return_fig=True)
+    return list(fig.data)
 
 # Create frames for different current and position values
 currents = np.linspace(0.1, 2, 20)
 positions = np.linspace(0.5, 1.5, 20)
 
-frames = []
+# The scene range has to hold the outer coils at the largest position factor
+outer_traces(1, positions[-1])
+layout = magpy.show(braunbek, backend='plotly', return_fig=True).layout
+
+# The current slider animates to the unmoved outer coils (position factor 1)
+frames = {}
 for current in currents:
-    for position in positions:
-        frame = go.Frame(
-            data=update_figure(current, position).data,
-            name=f'current_{current:.2f}_position_{position:.2f}'
-        )
-        frames.append(frame)
-
-# Create the initial figure
-initial_fig = update_figure(1, 1)
-
-# Create the final figure with frames and sliders
-fig = go.Figure(
-    data=initial_fig.data,
-    layout=initial_fig.layout,
-    frames=frames
-)
+    for position in [*positions, 1]:
+        name = f'current_{current:.2f}_position_{position:.2f}'
+        frames[name] = dict(current=current, position_factor=position)
 
 # Add sliders
 sliders = [
@@ -121,8 +124,18 @@ sliders = [
     )
 ]
 
-fig.update_layout(
+# Create the final figure, only frames the sliders can reach are built
+fig = animation_figure(
+    static=magpy.show(*inner_coils, backend='plotly', return_fig=True).data,
+    dynamic=outer_traces,
+    frames=frames,
+    initial=dict(current=1, position_factor=1),
+    layout=layout,
+    delta=DELTA_FRAMES,
     sliders=sliders,
+)
+
+fig.update_layout(
     title='Braunbek Coil Visualization',
     scene=dict(
         xaxis_title='X',
@@ -0,0 +1,37 @@
+import csv
+
+import numpy as np
+
+from coilsystem import ORIG_D1
+from sweep import braunbek_metrics, parameter_grid, run_sweep
+
+# Search the outer coil spacing of the scaled Braunbek for the best homogeneity.
+# Same design space as 1d_braunbek_scaled_animated_2.py, but computed in
+# parallel and without plotting.
+
+SCALINGS = [0.030/ORIG_D1, 0.035/ORIG_D1, 0.040/ORIG_D1]
+CURRENTS = np.linspace(0.1, 2, 20) # [A]
+POSITIONS = np.linspace(0.5, 1.5, 500)
+RADIUS = 0.010 # [m] radius of the volume for the homogeneity
+
+OUTPUT = "braunbek_sweep.csv"
+
+if __name__ == "__main__":
+    params = parameter_grid(scale=SCALINGS, current=CURRENTS,
+                            position_factor=POSITIONS, radius=[RADIUS])
+    rows = run_sweep(braunbek_metrics, params, OUTPUT)
+    print(f"Wrote {rows} design points to {OUTPUT}")
+
+    # Read back the table row by row and keep the best spacing per scaling
+    best = {}
+    with open(OUTPUT, newline="") as file:
+        for row in csv.DictReader(file):
+            scale = float(row["scale"])
+            if scale not in best or float(row["max_deviation_ppm"]) < float(best[scale]["max_deviation_ppm"]):
+                best[scale] = row
+
+    print()
+    for scale, row in sorted(best.items()):
+        print(f"Inner coils at +/-{ORIG_D1*scale*1000:.1f}mm: "
+              f"position factor {float(row['position_factor']):.3f}, "
+              f"{float(row['max_deviation_ppm']):.1f}ppm within {RADIUS*1000:.0f}mm")
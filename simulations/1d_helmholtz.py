@@ -1,45 +1,54 @@
 import numpy as np
-import magpylib as magpy
 import matplotlib.pyplot as plt
-from math import sqrt
+from math import ceil, sqrt
+
+from adaptive_grid import adaptive_grid
+from coilsystem import CoilSystem
+from winding_pack import WindingPack
 
 # Set some parameters for the design
 WIRE_DIAMETER = 1 # [mm]
 INNER_COIL_DIAMETER = 200 # [mm]
-WINDINGS_PER_COIL = 4
+WINDINGS_PER_COIL = 4 # any number, wound in layers of int(sqrt(WINDINGS_PER_COIL))
 CURRENT = 1 # [A]
 
-# Create a finite sized Helmholtz coil-pair
-coil1 = magpy.Collection()
-windingcount = 0
-for n1 in range(int(sqrt(WINDINGS_PER_COIL))):
-    for n2 in range(int(sqrt(WINDINGS_PER_COIL))):
-        windingcount = windingcount + 1
-        winding = magpy.current.Circle(
-            current=CURRENT,
-            diameter=INNER_COIL_DIAMETER/1000 + n2 * WIRE_DIAMETER/1000,
-            position=(0, 0, (n1+0.5)*WIRE_DIAMETER/1000), # offset by 1/2 diameter
-        )
-        coil1.add(winding)
-print(f"Using {windingcount} windings per coil")
-
-coil1.position = (0,0,INNER_COIL_DIAMETER/4000)
-coil2 = coil1.copy(position=(0,0,-INNER_COIL_DIAMETER/4000))
-helmholtz = magpy.Collection(coil1, coil2)
-
+# Create a finite sized Helmholtz coil-pair. Every coil is a winding pack
+# integrated over its cross-section, so any number of windings costs the same.
+# The layers grow by one wire diameter in diameter, i.e. half of it in radius,
+# and each coil is wound from +/-INNER_COIL_DIAMETER/4 towards +z.
+per_layer = int(sqrt(WINDINGS_PER_COIL))
+layers = ceil(WINDINGS_PER_COIL / per_layer)
+packs = [
+    WindingPack(
+        inner_radius=INNER_COIL_DIAMETER/2000,
+        turns=WINDINGS_PER_COIL,
+        wire_diameter=WIRE_DIAMETER/1000,
+        radial_build=layers * WIRE_DIAMETER/2000,
+        position=(0, 0, start + per_layer * WIRE_DIAMETER/2000),
+        current=CURRENT,
+    )
+    for start in (INNER_COIL_DIAMETER/4000, -INNER_COIL_DIAMETER/4000)
+]
+helmholtz_system = CoilSystem.series(*(pack.to_system() for pack in packs))
+print(f"Using {WINDINGS_PER_COIL} windings per coil")
+
+# show the single windings, the packs only stand in for them in the field
+helmholtz = CoilSystem.series(*(pack.turns_system() for pack in packs)).to_magpy()
 helmholtz.show()
 
-print(f"Field in center: {magpy.getB(helmholtz, [0, 0, 0])}")
+print(f"Field in center: {helmholtz_system.getB([0, 0, 0])}")
 
 
 
 fig, ax = plt.subplots(1, 1, figsize=(6,5))
 
-# Compute field and plot the coil pair field on yz-grid
-grid = np.mgrid[0:0:1j, -0.1:0.1:40j, -0.1:0.1:40j].T[:,:,0]
+# Compute the field adaptively on the yz-plane, refined near the windings,
+# and resample it onto the regular grid the streamplot needs
+sampled = adaptive_grid(helmholtz_system, (0, -0.1, -0.1), (0, 0.1, 0.1))
+print(f"Adaptive grid: {len(sampled.points)} field evaluations, {len(sampled.leaves)} cells")
+grid, B = sampled.resample(40)
 _, Y, Z = np.moveaxis(grid, 2, 0)
 
-B = magpy.getB(helmholtz, grid)
 _, By, Bz = np.moveaxis(B, 2, 0)
 
 Bamp = np.linalg.norm(B, axis=2)
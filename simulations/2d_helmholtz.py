@@ -3,6 +3,8 @@ import magpylib as magpy
 import matplotlib.pyplot as plt
 from math import sqrt
 
+from loopfield import loop_field, loops_from_magpy
+
 # Set some parameters for the design
 WIRE_DIAMETER = 1 # [mm]
 INNER_COIL_DIAMETER = 100 # [mm]
@@ -53,6 +55,9 @@ helmholtz2 = magpy.Collection(coil3, coil4)
 helmholtz_2d = magpy.Collection(helmholtz1, helmholtz2)
 helmholtz_2d.show()
 
+# flat loop arrays for the vectorized field engine
+loops = loops_from_magpy(helmholtz_2d)
+
 print(f"Field in center: {magpy.getB(helmholtz_2d, [0, 0, 0])}")
 
 
@@ -65,7 +70,7 @@ ax = axes[0]
 grid = np.mgrid[0:0:1j, -0.5:0.5:20j, -0.5:0.5:20j].T[:,:,0]
 _, Y, Z = np.moveaxis(grid, 2, 0)
 
-B = magpy.getB(helmholtz_2d, grid)
+B = loop_field(**loops, points=grid)
 _, By, Bz = np.moveaxis(B, 2, 0)
 
 Bamp = np.linalg.norm(B, axis=2)
@@ -97,7 +102,7 @@ ax2 = axes[1]
 grid = np.mgrid[0:0:1j, -0.1:0.1:40j, -0.1:0.1:40j].T[:,:,0]
 _, Y, Z = np.moveaxis(grid, 2, 0)
 
-B = magpy.getB(helmholtz_2d, grid)
+B = loop_field(**loops, points=grid)
 _, By, Bz = np.moveaxis(B, 2, 0)
 
 Bamp = np.linalg.norm(B, axis=2)
@@ -1,12 +1,9 @@
 import numpy as np
 import magpylib as magpy
 
-# From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
+from coilsystem import ORIG_D1, ORIG_D2, ORIG_R1, ORIG_R2, three_axis_braunbek
 
-ORIG_R1 = 0.780 # diameter of inner coils
-ORIG_R2 = 0.596 # diameter of outer coils
-ORIG_D1 = 0.108 # distance of inner coils
-ORIG_D2 = 0.330 # distance of outer coils
+# From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
 
 SCALING1 = 0.030/ORIG_D1
 SCALING2 = 0.035/ORIG_D1
@@ -27,149 +24,25 @@ def normalize(v):
        return v
     return v / norm
 
-# Create a finite sized Helmholtz coil-pair
-#######################################################################################################################
-R1 = ORIG_R1 * SCALING1
-R2 = ORIG_R2 * SCALING1
-D1 = ORIG_D1 * SCALING1
-D2 = ORIG_D2 * SCALING1
-print()
-print("1st Axis")
-print(f"Outer coils: d={R2*1000:.1f}mm positioned at +/-{D2*1000:.1f}mm")
-print(f"Inner coils: d={R1*1000:.1f}mm positioned at +/-{D1*1000:.1f}mm")
-
-coil1 = magpy.Collection()
-winding1 = magpy.current.Circle(
-    current=CURRENT1,
-    diameter=R2,
-    position=(0, 0, D2),
-)
-coil1.add(winding1)
-
-coil2 = magpy.Collection()
-winding2 = magpy.current.Circle(
-    current=CURRENT1,
-    diameter=R1,
-    position=(0, 0, D1),
-)
-coil2.add(winding2)
-
-coil3 = magpy.Collection()
-winding3 = magpy.current.Circle(
-    current=CURRENT1,
-    diameter=R1,
-    position=(0, 0, -D1),
-)
-coil3.add(winding3)
-
-coil4 = magpy.Collection()
-winding4 = magpy.current.Circle(
-    current=CURRENT1,
-    diameter=R2,
-    position=(0, 0, -D2),
+# Create the nested 3-axis Braunbek set, one group per axis
+system = three_axis_braunbek(
+    scales=(SCALING1, SCALING2, SCALING3),
+    currents=(CURRENT1, CURRENT2, CURRENT3),
+    axes=("z", "y", "x"),
 )
-coil4.add(winding4)
 
-braunbek1 = magpy.Collection(coil1, coil2, coil3, coil4)
-braunbek1.set_children_styles(color=color1)
-
-#######################################################################################################################
-R1 = ORIG_R1 * SCALING2
-R2 = ORIG_R2 * SCALING2
-D1 = ORIG_D1 * SCALING2
-D2 = ORIG_D2 * SCALING2
+for name, scaling in zip(("1st", "2nd", "3rd"), (SCALING1, SCALING2, SCALING3)):
+    print()
+    print(f"{name} Axis")
+    print(f"Outer coils: d={ORIG_R2*scaling*1000:.1f}mm positioned at +/-{ORIG_D2*scaling*1000:.1f}mm")
+    print(f"Inner coils: d={ORIG_R1*scaling*1000:.1f}mm positioned at +/-{ORIG_D1*scaling*1000:.1f}mm")
 print()
-print("2nd Axis")
-print(f"Outer coils: d={R2*1000:.1f}mm positioned at +/-{D2*1000:.1f}mm")
-print(f"Inner coils: d={R1*1000:.1f}mm positioned at +/-{D1*1000:.1f}mm")
-
-coil5 = magpy.Collection()
-winding5 = magpy.current.Circle(
-    current=CURRENT2,
-    diameter=R2,
-    position=(0, 0, D2),
-)
-coil5.add(winding5)
 
-coil6 = magpy.Collection()
-winding6 = magpy.current.Circle(
-    current=CURRENT2,
-    diameter=R1,
-    position=(0, 0, D1),
-)
-coil6.add(winding6)
-
-coil7 = magpy.Collection()
-winding7 = magpy.current.Circle(
-    current=CURRENT2,
-    diameter=R1,
-    position=(0, 0, -D1),
-)
-coil7.add(winding7)
-
-coil8 = magpy.Collection()
-winding8 = magpy.current.Circle(
-    current=CURRENT2,
-    diameter=R2,
-    position=(0, 0, -D2),
-)
-coil8.add(winding8)
-
-braunbek2 = magpy.Collection(coil5, coil6, coil7, coil8)
-braunbek2.set_children_styles(color=color2)
-braunbek2.rotate_from_angax(-90, "x", anchor=0, start=0)
-
-#######################################################################################################################
-R1 = ORIG_R1 * SCALING3
-R2 = ORIG_R2 * SCALING3
-D1 = ORIG_D1 * SCALING3
-D2 = ORIG_D2 * SCALING3
-print()
-print("3rd Axis")
-print(f"Outer coils: d={R2*1000:.1f}mm positioned at +/-{D2*1000:.1f}mm")
-print(f"Inner coils: d={R1*1000:.1f}mm positioned at +/-{D1*1000:.1f}mm")
-print()
-
-coil9 = magpy.Collection()
-winding9 = magpy.current.Circle(
-    current=CURRENT3,
-    diameter=R2,
-    position=(0, 0, D2),
-)
-coil9.add(winding9)
-
-coil10 = magpy.Collection()
-winding10 = magpy.current.Circle(
-    current=CURRENT3,
-    diameter=R1,
-    position=(0, 0, D1),
-)
-coil10.add(winding10)
-
-coil11 = magpy.Collection()
-winding11 = magpy.current.Circle(
-    current=CURRENT3,
-    diameter=R1,
-    position=(0, 0, -D1),
-)
-coil11.add(winding11)
-
-coil12 = magpy.Collection()
-winding12 = magpy.current.Circle(
-    current=CURRENT3,
-    diameter=R2,
-    position=(0, 0, -D2),
-)
-coil12.add(winding12)
-
-braunbek3 = magpy.Collection(coil9, coil10, coil11, coil12)
-braunbek3.set_children_styles(color=color3)
-braunbek3.rotate_from_angax(90, "y", anchor=0, start=0)
-
-braunbek = magpy.Collection(braunbek1, braunbek2, braunbek3)
+braunbek = system.to_magpy(colors=(color1, color2, color3))
+braunbek1, braunbek2, braunbek3 = braunbek.children
 
 sensor = magpy.Sensor(position=(0,0,0))
-B = braunbek.getB(sensor.position)
+B = system.getB(sensor.position)
 vector_trace = {
     "backend": "plotly",
     "constructor": "Cone",
@@ -199,21 +72,11 @@ print(f"Field in center: {magpy.getB(braunbek, [0, 0, 0])}")
 
 
 """
-fig, ax = plt.subplots(1, 1, figsize=(6,5))
+from fieldlines import plot_field_lines
 
-# Compute field and plot the coil pair field on yz-grid
-grid = np.mgrid[0:0:1j, -0.05:0.05:20j, -0.05:0.05:20j].T[:,:,0]
-_, Y, Z = np.moveaxis(grid, 2, 0)
-
-B = magpy.getB(braunbek, grid)
-_, By, Bz = np.moveaxis(B, 2, 0)
-
-Bamp = np.linalg.norm(B, axis=2)
-Bamp /= np.amax(Bamp)
+fig, ax = plt.subplots(1, 1, figsize=(6,5))
 
-sp = ax.streamplot(Y, Z, By, Bz, density=5, color=Bamp,
-    linewidth=np.sqrt(Bamp)*3, cmap='coolwarm',
-)
+plot_field_lines(ax, system, (0, -0.05, -0.05), (0, 0.05, 0.05), density=2)
 
 # Plot coil outline
 #from matplotlib.patches import Rectangle
@@ -227,7 +90,6 @@ ax.set(
     ylabel='z-position (m)',
     aspect=1,
 )
-plt.colorbar(sp.lines, ax=ax, label='(T)')
 
 
 
@@ -1,14 +1,13 @@
 import numpy as np
 import magpylib as magpy
-import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-# From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
+from animation import animation_figure, field_cone
+from coilsystem import ORIG_D1, ORIG_D2, ORIG_R1, ORIG_R2, three_axis_braunbek
+from field_basis import field_basis, superpose
+from profiling import span
 
-ORIG_R1 = 0.780 # diameter of inner coils
-ORIG_R2 = 0.596 # diameter of outer coils
-ORIG_D1 = 0.108 # distance of inner coils
-ORIG_D2 = 0.330 # distance of outer coils
+# From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
 
 SCALING1 = 0.030/ORIG_D1
 SCALING2 = 0.035/ORIG_D1
@@ -29,213 +28,62 @@ def normalize(v):
        return v
     return v / norm
 
-# Create a finite sized Helmholtz coil-pair
-#######################################################################################################################
-R1 = ORIG_R1 * SCALING1
-R2 = ORIG_R2 * SCALING1
-D1 = ORIG_D1 * SCALING1
-D2 = ORIG_D2 * SCALING1
-print()
-print("1st Axis")
-print(f"Outer coils: d={R2*1000:.1f}mm positioned at +/-{D2*1000:.1f}mm")
-print(f"Inner coils: d={R1*1000:.1f}mm positioned at +/-{D1*1000:.1f}mm")
-
-coil1 = magpy.Collection()
-winding1 = magpy.current.Circle(
-    current=CURRENT1,
-    diameter=R2,
-    position=(0, 0, D2),
-)
-coil1.add(winding1)
-
-coil2 = magpy.Collection()
-winding2 = magpy.current.Circle(
-    current=CURRENT1,
-    diameter=R1,
-    position=(0, 0, D1),
-)
-coil2.add(winding2)
-
-coil3 = magpy.Collection()
-winding3 = magpy.current.Circle(
-    current=CURRENT1,
-    diameter=R1,
-    position=(0, 0, -D1),
-)
-coil3.add(winding3)
-
-coil4 = magpy.Collection()
-winding4 = magpy.current.Circle(
-    current=CURRENT1,
-    diameter=R2,
-    position=(0, 0, -D2),
-)
-coil4.add(winding4)
-
-braunbek1 = magpy.Collection(coil1, coil2, coil3, coil4)
-braunbek1.set_children_styles(color=color1)
-
-#######################################################################################################################
-R1 = ORIG_R1 * SCALING2
-R2 = ORIG_R2 * SCALING2
-D1 = ORIG_D1 * SCALING2
-D2 = ORIG_D2 * SCALING2
-print()
-print("2nd Axis")
-print(f"Outer coils: d={R2*1000:.1f}mm positioned at +/-{D2*1000:.1f}mm")
-print(f"Inner coils: d={R1*1000:.1f}mm positioned at +/-{D1*1000:.1f}mm")
-
-coil5 = magpy.Collection()
-winding5 = magpy.current.Circle(
-    current=CURRENT2,
-    diameter=R2,
-    position=(0, 0, D2),
-)
-coil5.add(winding5)
-
-coil6 = magpy.Collection()
-winding6 = magpy.current.Circle(
-    current=CURRENT2,
-    diameter=R1,
-    position=(0, 0, D1),
-)
-coil6.add(winding6)
-
-coil7 = magpy.Collection()
-winding7 = magpy.current.Circle(
-    current=CURRENT2,
-    diameter=R1,
-    position=(0, 0, -D1),
-)
-coil7.add(winding7)
-
-coil8 = magpy.Collection()
-winding8 = magpy.current.Circle(
-    current=CURRENT2,
-    diameter=R2,
-    position=(0, 0, -D2),
-)
-coil8.add(winding8)
+# Phases are timed with COILS_PROFILE=1, see profiling.py
 
-braunbek2 = magpy.Collection(coil5, coil6, coil7, coil8)
-braunbek2.set_children_styles(color=color2)
-braunbek2.rotate_from_angax(-90, "x", anchor=0, start=0)
+# Create the nested 3-axis Braunbek set, one group per axis
+with span("geometry"):
+    system = three_axis_braunbek(
+        scales=(SCALING1, SCALING2, SCALING3),
+        currents=(CURRENT1, CURRENT2, CURRENT3),
+        axes=("z", "y", "x"),
+    )
 
-#######################################################################################################################
-R1 = ORIG_R1 * SCALING3
-R2 = ORIG_R2 * SCALING3
-D1 = ORIG_D1 * SCALING3
-D2 = ORIG_D2 * SCALING3
-print()
-print("3rd Axis")
-print(f"Outer coils: d={R2*1000:.1f}mm positioned at +/-{D2*1000:.1f}mm")
-print(f"Inner coils: d={R1*1000:.1f}mm positioned at +/-{D1*1000:.1f}mm")
+for name, scaling in zip(("1st", "2nd", "3rd"), (SCALING1, SCALING2, SCALING3)):
+    print()
+    print(f"{name} Axis")
+    print(f"Outer coils: d={ORIG_R2*scaling*1000:.1f}mm positioned at +/-{ORIG_D2*scaling*1000:.1f}mm")
+    print(f"Inner coils: d={ORIG_R1*scaling*1000:.1f}mm positioned at +/-{ORIG_D1*scaling*1000:.1f}mm")
 print()
 
-coil9 = magpy.Collection()
-winding9 = magpy.current.Circle(
-    current=CURRENT3,
-    diameter=R2,
-    position=(0, 0, D2),
-)
-coil9.add(winding9)
+with span("geometry"):
+    braunbek = system.to_magpy(colors=(color1, color2, color3))
+braunbek1, braunbek2, braunbek3 = braunbek.children
 
-coil10 = magpy.Collection()
-winding10 = magpy.current.Circle(
-    current=CURRENT3,
-    diameter=R1,
-    position=(0, 0, D1),
-)
-coil10.add(winding10)
+# The geometry is fixed, so the unit-current field of each axis at the sensor
+# only has to be computed once. Every current combination is then a 3x3 product.
+SENSOR_POSITION = (0, 0, 0)
+basis = field_basis(braunbek.children, SENSOR_POSITION)
 
-coil11 = magpy.Collection()
-winding11 = magpy.current.Circle(
-    current=CURRENT3,
-    diameter=R1,
-    position=(0, 0, -D1),
-)
-coil11.add(winding11)
-
-coil12 = magpy.Collection()
-winding12 = magpy.current.Circle(
-    current=CURRENT3,
-    diameter=R2,
-    position=(0, 0, -D2),
-)
-coil12.add(winding12)
 
-braunbek3 = magpy.Collection(coil9, coil10, coil11, coil12)
-braunbek3.set_children_styles(color=color3)
-braunbek3.rotate_from_angax(90, "y", anchor=0, start=0)
 
-braunbek = magpy.Collection(braunbek1, braunbek2, braunbek3)
 
 
+# Only the field cone changes between frames. With DELTA_FRAMES the coils and
+# the sensor are stored once and every frame only holds the cone.
+DELTA_FRAMES = True
 
+# Current arrows are hidden, they would keep showing the initial direction
+braunbek.set_children_styles(arrow_show=False)
+sensor = magpy.Sensor(position=SENSOR_POSITION)
+with span("magpy.show"):
+    initial_fig = magpy.show(braunbek, sensor, backend='plotly', return_fig=True)
 
-
-
-
-# Create a function to update the current and position, and return the updated figure
-def update_figure(current1, current2, current3):
-    for n, braunbek_part in enumerate(braunbek.children):
-        for coil in braunbek_part:
-            for winding in coil.children:
-                if n == 0:
-                    winding.current = current1
-                if n == 1:
-                    winding.current = current2
-                if n == 2:
-                    winding.current = current3
-
-    # update the sensor
-    sensor = magpy.Sensor(position=(0,0,0))
-    B = braunbek.getB(sensor.position)
-    vector_trace = {
-        "backend": "plotly",
-        "constructor": "Cone",
-        "kwargs": {
-            "x": [sensor.position[0]],
-            "y": [sensor.position[1]],
-            "z": [sensor.position[2]],
-            "u": [B[0]],
-            "v": [B[1]],
-            "w": [B[2]],
-            "colorscale": "Blues",
-            "sizemode": "absolute",
-            "sizeref": 0.1,
-            "showscale": False,
-        }
-    }
-    sensor.style.model3d.add_trace(vector_trace)
-    
-    fig = magpy.show(braunbek, sensor, backend='plotly', return_fig=True)
-    return fig
+# Create a function returning the traces that change with the currents
+def sensor_traces(current1, current2, current3):
+    B = superpose(basis, (current1, current2, current3))
+    return [field_cone(SENSOR_POSITION, B)]
 
 # Create frames for different current and position values
 currents1 = np.linspace(-1, 1, 5)
 currents2 = np.linspace(-1, 1, 5)
 currents3 = np.linspace(-1, 1, 5)
 
-frames = []
+frames = {}
 for current1 in currents1:
     for current2 in currents2:
         for current3 in currents3:
-            frame = go.Frame(
-                data=update_figure(current1, current2, current3).data,
-                name=f'current1_{current1:.2f}_current2_{current2:.2f}_current3_{current3:.2f}'
-            )
-            frames.append(frame)
-
-# Create the initial figure
-initial_fig = update_figure(-1, -1, -1)
-
-# Create the final figure with frames and sliders
-fig = go.Figure(
-    data=initial_fig.data,
-    layout=initial_fig.layout,
-    frames=frames
-)
+            name = f'current1_{current1:.2f}_current2_{current2:.2f}_current3_{current3:.2f}'
+            frames[name] = dict(current1=current1, current2=current2, current3=current3)
 
 # Add sliders
 """
@@ -285,8 +133,19 @@ sliders = [
     )
 ]
 
+# Create the final figure, only frames the sliders can reach are built
+with span("animation"):
+    fig = animation_figure(
+        static=initial_fig.data,
+        dynamic=sensor_traces,
+        frames=frames,
+        initial=dict(current1=-1, current2=-1, current3=-1),
+        layout=initial_fig.layout,
+        delta=DELTA_FRAMES,
+        sliders=sliders,
+    )
+
 fig.update_layout(
-    sliders=sliders,
     title='Braunbek Coil Visualization',
     scene=dict(
         xaxis_title='X',
@@ -296,4 +155,6 @@ fig.update_layout(
     )
 )
 
-fig.show()
+# Serialises the figure to HTML and opens it
+with span("show"):
+    fig.show()
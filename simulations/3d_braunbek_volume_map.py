@@ -0,0 +1,41 @@
+from coilsystem import ORIG_D1, three_axis_braunbek
+from volume_map import write_volume_map
+
+# Full 3D field map of the nested 3-axis Braunbek for export.
+# Interrupt at any time, running the script again continues where it stopped.
+
+SCALING1 = 0.030/ORIG_D1
+SCALING2 = 0.035/ORIG_D1
+SCALING3 = 0.040/ORIG_D1
+
+# Set some parameters for the design
+CURRENT1 = 1 # [A]
+CURRENT2 = 1 # [A]
+CURRENT3 = 1 # [A]
+
+EXTENT = 0.050 # [m] the map covers +/-EXTENT on every axis
+RESOLUTION = 200 # points per axis
+OUTPUT = "braunbek_volume_map.npy"
+
+system = three_axis_braunbek(
+    scales=(SCALING1, SCALING2, SCALING3),
+    currents=(CURRENT1, CURRENT2, CURRENT3),
+    axes=("z", "y", "x"),
+)
+
+def report(done, total):
+    print(f"\r{done}/{total} chunks", end="", flush=True)
+
+volume = write_volume_map(
+    system,
+    OUTPUT,
+    lower=(-EXTENT, -EXTENT, -EXTENT),
+    upper=(EXTENT, EXTENT, EXTENT),
+    shape=(RESOLUTION, RESOLUTION, RESOLUTION),
+    progress=report,
+)
+print()
+
+center = volume.index((0, 0, 0))
+print(f"Map of {volume.shape} points written to {OUTPUT}")
+print(f"Field in center: {volume.data[center]}")
@@ -0,0 +1,178 @@
+import numpy as np
+
+# Adaptive quadtree/octree sampling of a field over an axis aligned box.
+#
+# Axes with lower == upper are held fixed, so a yz slice like
+# np.mgrid[0:0:1j, -0.5:0.5:20j, -0.5:0.5:20j] becomes a quadtree and a full
+# box an octree. Every cell is evaluated at its corners and its centre. A
+# cell is split when the field at the centre differs from the multilinear
+# interpolation of its corners by more than rtol * |B| + atol, so points
+# gather near the windings and stay sparse in the smooth centre. Inside a
+# leaf the field is interpolated from the corners with a bubble correction
+# through the centre value.
+#
+# All positions live on an integer lattice of the finest level. Corners
+# shared by neighbouring cells are therefore evaluated only once and the
+# evaluated values are looked up by their lattice key.
+
+
+class AdaptiveGrid:
+    """Result of adaptive_grid.
+
+    points  (n, 3) all evaluated positions
+    B       (n, 3) field at points
+    leaves  (m, d) lattice index of the lower corner of each leaf cell
+    level   (m,)   refinement level of each leaf cell
+    """
+
+    def __init__(self, lower, upper, axes, base, max_level, keys, points, B, leaves, level):
+        self.lower = lower
+        self.upper = upper
+        self.axes = axes
+        self.base = base
+        self.max_level = max_level
+        self.points = points
+        self.B = B
+        self.leaves = leaves
+        self.level = level
+        self._n = base * 2**max_level
+        order = np.argsort(keys)
+        self._keys = keys[order]
+        self._order = order
+
+    @property
+    def spacing(self):
+        """Lattice spacing of the finest level along the active axes [m]."""
+        return (self.upper[self.axes] - self.lower[self.axes]) / self._n
+
+    def leaf_size(self):
+        """Edge length of the leaf cells along the active axes [m], shape (m, d)."""
+        return self.spacing * 2.0 ** (self.max_level - self.level)[:, None]
+
+    def leaf_center(self):
+        """Centre of the leaf cells, shape (m, 3)."""
+        return self._to_points(self.leaves + 2.0 ** (self.max_level - self.level)[:, None] / 2)
+
+    def _to_points(self, lattice):
+        points = np.broadcast_to(self.lower, (*lattice.shape[:-1], 3)).copy()
+        points[..., self.axes] += lattice * self.spacing
+        return points
+
+    def _encode(self, lattice):
+        return np.ravel_multi_index(np.moveaxis(lattice, -1, 0), (self._n + 1,) * len(self.axes))
+
+    def _lookup(self, lattice):
+        i = np.searchsorted(self._keys, self._encode(lattice))
+        return self.B[self._order[i]]
+
+    def field_at(self, points):
+        """Field at arbitrary points in the box, interpolated inside the leaf cells."""
+        points = np.asarray(points, dtype=float)
+        flat = points.reshape(-1, 3)
+        u = np.clip((flat[:, self.axes] - self.lower[self.axes]) / self.spacing, 0, self._n)
+
+        # find the leaf containing every point, coarsest level first
+        leaf_keys = self._encode(self.leaves)
+        corner = np.zeros((len(flat), len(self.axes)), dtype=int)
+        size = np.zeros(len(flat), dtype=int)
+        found = np.zeros(len(flat), dtype=bool)
+        for level in range(self.max_level + 1):
+            s = 2 ** (self.max_level - level)
+            candidates = leaf_keys[self.level == level]
+            if not len(candidates):
+                continue
+            candidates = np.sort(candidates)
+            c = np.minimum(np.floor(u / s).astype(int), self._n // s - 1) * s
+            k = self._encode(c)
+            i = np.minimum(np.searchsorted(candidates, k), len(candidates) - 1)
+            hit = ~found & (candidates[i] == k)
+            corner[hit] = c[hit]
+            size[hit] = s
+            found |= hit
+
+        # multilinear interpolation from the corners of the leaf, plus a bubble
+        # term that matches the centre value and vanishes on the cell faces
+        t = (u - corner) / size[:, None]
+        B = np.zeros((len(flat), 3))
+        mean = np.zeros((len(flat), 3))
+        for offset in np.ndindex(*(2,) * len(self.axes)):
+            offset = np.array(offset)
+            weight = np.prod(np.where(offset, t, 1 - t), axis=1)
+            corner_B = self._lookup(corner + offset * size[:, None])
+            B += weight[:, None] * corner_B
+            mean += corner_B / 2**len(self.axes)
+        has_center = size > 1
+        bubble = np.prod(4 * t * (1 - t), axis=1)
+        center_B = self._lookup(corner[has_center] + size[has_center, None] // 2)
+        B[has_center] += bubble[has_center, None] * (center_B - mean[has_center])
+        return B.reshape(points.shape)
+
+    def resample(self, n):
+        """Regular grid with n points per active axis and the interpolated field.
+
+        The grid has the layout of np.mgrid[...].T with the fixed axes
+        dropped, as used for the streamplots in the scripts.
+        """
+        axes = [np.linspace(lo, hi, n if lo != hi else 1) for lo, hi in zip(self.lower, self.upper)]
+        grid = np.stack(np.meshgrid(*axes, indexing="ij")).T
+        grid = grid.reshape([s for s in grid.shape[:-1] if s != 1] + [3])
+        return grid, self.field_at(grid)
+
+
+def adaptive_grid(source, lower, upper, base=4, max_level=5, rtol=3e-3, atol=0.0):
+    """Sample source.getB adaptively over the box from lower to upper.
+
+    base cells per active axis at level 0, refined up to max_level times.
+    rtol is relative to the field at the cell centre, atol in [T].
+    """
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    axes = np.flatnonzero(upper > lower)
+    d = len(axes)
+    n = base * 2**max_level
+    dims = (n + 1,) * d
+    offsets = np.array(list(np.ndindex(*(2,) * d)))
+
+    keys = np.empty(0, dtype=np.int64)
+    values = np.empty((0, 3))
+    points_all = np.empty((0, 3))
+
+    def to_points(lattice):
+        points = np.broadcast_to(lower, (len(lattice), 3)).copy()
+        points[:, axes] += lattice * (upper[axes] - lower[axes]) / n
+        return points
+
+    def evaluate(lattice):
+        # field at lattice points, evaluating only the ones not seen before
+        nonlocal keys, values, points_all
+        k = np.ravel_multi_index(lattice.T, dims)
+        unseen = ~np.isin(k, keys)
+        new, first = np.unique(k[unseen], return_index=True)
+        if len(new):
+            fresh = to_points(lattice[unseen][first])
+            keys = np.concatenate((keys, new))
+            values = np.concatenate((values, source.getB(fresh)))
+            points_all = np.concatenate((points_all, fresh))
+        order = np.argsort(keys)
+        return values[order[np.searchsorted(keys[order], k)]]
+
+    cells = np.array(list(np.ndindex(*(base,) * d))) * 2**max_level
+    leaves, levels = [], []
+    for level in range(max_level + 1):
+        size = 2 ** (max_level - level)
+        corners = evaluate((cells[:, None, :] + offsets * size).reshape(-1, d)).reshape(len(cells), -1, 3)
+        center = evaluate(cells + size // 2) if size > 1 else corners.mean(axis=1)
+
+        error = np.linalg.norm(center - corners.mean(axis=1), axis=1)
+        split = error > rtol * np.linalg.norm(center, axis=1) + atol
+        if size == 1:
+            split[:] = False
+
+        leaves.append(cells[~split])
+        levels.append(np.full((~split).sum(), level))
+        if not np.any(split):
+            break
+        cells = (cells[split][:, None, :] + offsets * (size // 2)).reshape(-1, d)
+
+    return AdaptiveGrid(lower, upper, axes, base, max_level, keys, points_all, values,
+                        np.concatenate(leaves), np.concatenate(levels))
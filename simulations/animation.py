@@ -0,0 +1,115 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from profiling import span
+
+# Plotly animations where only part of the scene changes between frames.
+#
+# With delta=True the unchanging traces (coil meshes) are put into the figure
+# once and every frame only carries the traces that change, addressed through
+# go.Frame(traces=...). Numeric arrays are stored as float32/int32 numpy
+# arrays, which plotly serialises as base64 typed arrays instead of JSON lists.
+#
+# Frames are only built when something can show them: given the sliders and
+# buttons of the figure, only the frame names their steps animate to are
+# built.
+
+FLOAT_KEYS = ("x", "y", "z", "u", "v", "w", "intensity")
+INT_KEYS = ("i", "j", "k")
+
+
+def compact(trace):
+    """Store the numeric arrays of a trace as float32/int32 arrays, in place."""
+    for keys, dtype in ((FLOAT_KEYS, np.float32), (INT_KEYS, np.int32)):
+        for key in keys:
+            value = getattr(trace, key, None)
+            if value is None or isinstance(value, str):
+                continue
+            try:
+                # line breaks given as None become NaN, which plotly also treats as gaps
+                setattr(trace, key, np.asarray(value, dtype=dtype))
+            except (TypeError, ValueError):
+                pass # e.g. categorical data, leave as is
+    return trace
+
+
+def field_cone(position, B, **kwargs):
+    """Cone trace showing the field vector B at position."""
+    cone = dict(
+        x=[position[0]],
+        y=[position[1]],
+        z=[position[2]],
+        u=[B[0]],
+        v=[B[1]],
+        w=[B[2]],
+        colorscale="Blues",
+        sizemode="absolute",
+        sizeref=0.1,
+        showscale=False,
+    )
+    cone.update(kwargs)
+    return go.Cone(**cone)
+
+
+def reachable_frames(sliders=(), updatemenus=()):
+    """Frame names the animate steps of sliders and buttons can reach.
+
+    Returns None if a step plays all frames.
+    """
+    steps = [step for slider in sliders for step in slider.get("steps", ())]
+    steps += [button for menu in updatemenus for button in menu.get("buttons", ())]
+
+    names = set()
+    for step in steps:
+        if step.get("method") != "animate":
+            continue
+        args = step.get("args") or [None]
+        target = args[0]
+        if target is None:
+            return None
+        names.update([target] if isinstance(target, str) else target)
+    return names
+
+
+def animation_figure(static, dynamic, frames, initial, layout=None, delta=True,
+                     sliders=None, updatemenus=None):
+    """Figure with one frame per entry of frames.
+
+    static   list of traces that are the same in every frame
+    dynamic  function(**params) returning the list of changing traces
+    frames   dict frame name -> params for dynamic
+    initial  params for the data shown before any frame is selected
+
+    With delta=False every frame repeats the static traces as well. If sliders
+    or updatemenus are given they are added to the layout and only the frames
+    they can reach are built.
+    """
+    static = [compact(trace) for trace in static]
+    shown = [compact(trace) for trace in dynamic(**initial)]
+    changing = list(range(len(static), len(static) + len(shown)))
+
+    def build(name, **params):
+        with span("frame traces"):
+            traces = [compact(trace) for trace in dynamic(**params)]
+        with span("go.Frame"):
+            if delta:
+                return go.Frame(data=traces, traces=changing, name=name)
+            return go.Frame(data=static + traces, name=name)
+
+    names = list(frames)
+    if sliders is not None or updatemenus is not None:
+        reachable = reachable_frames(sliders or (), updatemenus or ())
+        if reachable is not None:
+            missing = reachable.difference(frames)
+            if missing:
+                raise ValueError(f"Steps animate to unknown frames: {sorted(missing)}")
+            names = [name for name in names if name in reachable]
+
+    built = [build(name, **frames[name]) for name in names]
+    with span("go.Figure"):
+        fig = go.Figure(data=static + shown, layout=layout, frames=built)
+    if sliders is not None:
+        fig.update_layout(sliders=sliders)
+    if updatemenus is not None:
+        fig.update_layout(updatemenus=updatemenus)
+    return fig
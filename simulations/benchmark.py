@@ -0,0 +1,335 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+import profiling
+from coilsystem import ORIG_D1, CoilSystem, braunbek, helmholtz, three_axis_braunbek
+
+# Benchmarks of the shipped coil scenarios.
+#
+#   python benchmark.py                      run and compare against the baseline
+#   python benchmark.py --save-baseline      run and store the result as baseline
+#   python benchmark.py --full               include the 200^3 grids
+#
+# Every scenario is timed for building the system, the field on yz-plane and
+# volume grids around it, the field evaluations of its scripts (their plot
+# grids, field lines and homogeneity tables) and for the animated scripts the
+# frame generation and the figure serialisation, with the sliders of the
+# scripts so that the same frames are built. Each timing is the best of
+# --repeat runs. The results are written as JSON, timings slower than the
+# baseline by more than --tolerance (and --min-seconds) are reported and make
+# the run exit with status 1. Without a baseline the first run stores its
+# results as the baseline.
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# name -> (points per axis, dimensions)
+GRIDS = {
+    "grid_20^2": (20, 2),
+    "grid_40^2": (40, 2),
+    "grid_200^2": (200, 2),
+    "grid_20^3": (20, 3),
+    "grid_50^3": (50, 3),
+    "grid_100^3": (100, 3),
+    "grid_200^3": (200, 3),
+}
+FULL_ONLY = ("grid_200^3",)
+
+
+def _helmholtz_2d():
+    # the two perpendicular pairs of 2d_helmholtz.py
+    pair = helmholtz(0.100)
+    return CoilSystem.concat(pair, pair.rotated(-90, "x"))
+
+
+SCENARIOS = {
+    "helmholtz": lambda: helmholtz(0.200),
+    "2d_helmholtz": _helmholtz_2d,
+    "braunbek": lambda: braunbek(1.0),
+    "scaled_braunbek": lambda: braunbek(0.030/ORIG_D1),
+    "3d_braunbek": lambda: three_axis_braunbek((0.030/ORIG_D1, 0.035/ORIG_D1, 0.040/ORIG_D1)),
+}
+
+
+def grid(system, n, dims):
+    """yz-plane (dims=2) or cube (dims=3) grid covering the windings."""
+    extent = 1.2 * np.amax(np.linalg.norm(system.position, axis=1) + system.radius)
+    axes = [np.linspace(-extent, extent, n)] * 3
+    if dims == 2:
+        axes[0] = np.zeros(1)
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+
+
+def best_of(repeat, function):
+    best = np.inf
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - t)
+    return best, result
+
+
+def _slider(prefix, steps):
+    # slider animating to the frame names of steps, a list of (name, label)
+    return dict(
+        currentvalue={"prefix": prefix},
+        steps=[dict(
+            method="animate",
+            args=[[name], dict(mode="immediate", frame=dict(duration=0, redraw=True),
+                               transition=dict(duration=0))],
+            label=label,
+        ) for name, label in steps],
+    )
+
+
+def current_animation(system):
+    # frames and sliders of 3d_braunbek_animated.py: one field cone per current
+    # combination, each slider varies one axis with the others at -1 A
+    import magpylib as magpy
+
+    from animation import animation_figure, field_cone
+    from field_basis import field_basis, superpose
+
+    collection = system.to_magpy()
+    basis = field_basis(collection.children, (0, 0, 0))
+    static = magpy.show(collection, backend="plotly", return_fig=True).data
+    currents = np.linspace(-1, 1, 5)
+    frames = {f"{a:.2f}_{b:.2f}_{c:.2f}": dict(currents=(a, b, c))
+              for a in currents for b in currents for c in currents}
+    sliders = [
+        _slider(f"Current {axis + 1}: ", [
+            ("_".join(f"{value if i == axis else -1:.2f}" for i in range(3)), f"{value:.2f}")
+            for value in currents
+        ])
+        for axis in range(3)
+    ]
+
+    def dynamic(currents):
+        return [field_cone((0, 0, 0), superpose(basis, currents))]
+
+    return lambda: animation_figure(static, dynamic, frames, initial=dict(currents=(-1, -1, -1)),
+                                    sliders=sliders)
+
+
+def scaled_current_animation(system):
+    # frames and slider of 1d_braunbek_scaled_animated.py: the field cone at the
+    # centre for every current
+    import magpylib as magpy
+
+    from animation import animation_figure, field_cone
+    from field_basis import field_basis, superpose
+
+    collection = system.to_magpy()
+    basis = field_basis([collection], (0, 0, 0))
+    static = magpy.show(collection, backend="plotly", return_fig=True).data
+    currents = np.linspace(0.1, 2, 20)
+    frames = {f"{current:.2f}": dict(current=current) for current in currents}
+    sliders = [_slider("Current 1: ", [(name, name) for name in frames])]
+
+    def dynamic(current):
+        return [field_cone((0, 0, 0), superpose(basis, [current]))]
+
+    return lambda: animation_figure(static, dynamic, frames, initial=dict(current=1),
+                                    sliders=sliders)
+
+
+def position_animation(system):
+    # frames and sliders of 1d_braunbek_scaled_animated_2.py: the outer coils
+    # change current at their original position or move at 1 A
+    import magpylib as magpy
+
+    from animation import animation_figure
+
+    outer = system.select([0, 3])
+    inner = system.select([1, 2])
+    static = magpy.show(inner.to_magpy(), backend="plotly", return_fig=True).data
+    currents = np.linspace(0.1, 2, 20)
+    factors = np.linspace(0.5, 1.5, 20)
+    frames = {f"{current:.2f}_{factor:.2f}": dict(current=current, factor=factor)
+              for current in currents for factor in [*factors, 1]}
+    sliders = [
+        _slider("Current: ", [(f"{current:.2f}_{1:.2f}", f"{current:.2f}") for current in currents]),
+        _slider("Position factor: ", [(f"{1:.2f}_{factor:.2f}", f"{factor:.2f}") for factor in factors]),
+    ]
+
+    def dynamic(current, factor):
+        moved = outer.copy(position=outer.position * factor, current=outer.current * current)
+        return list(magpy.show(moved.to_magpy(), backend="plotly", return_fig=True).data)
+
+    return lambda: animation_figure(static, dynamic, frames, initial=dict(current=1, factor=1.0),
+                                    sliders=sliders)
+
+
+def _plane(extent, n):
+    # the yz-plane grid of the streamplots in the scripts
+    return lambda system: lambda: system.getB(
+        np.mgrid[0:0:1j, -extent:extent:n * 1j, -extent:extent:n * 1j].T[:, :, 0])
+
+
+def _adaptive(extent, n):
+    # the adaptive yz-plane grid of 1d_helmholtz.py, resampled for its streamplot
+    def build(system):
+        from adaptive_grid import adaptive_grid
+
+        return lambda: adaptive_grid(system, (0, -extent, -extent), (0, extent, extent)).resample(n)
+
+    return build
+
+
+def _field_lines(extent, density):
+    # plot_field_lines on the yz-plane as the scripts draw them, without pyplot
+    def build(system):
+        from matplotlib.figure import Figure
+
+        from fieldlines import plot_field_lines
+
+        def draw():
+            ax = Figure().add_subplot()
+            return plot_field_lines(ax, system, (0, -extent, -extent), (0, extent, extent), density)
+
+        return draw
+
+    return build
+
+
+def _homogeneity(system):
+    # the table that homogeneity.compare prints for the scripts
+    from homogeneity import homogeneous_region
+
+    return lambda: [homogeneous_region(system, ppm) for ppm in (10, 100, 1000)]
+
+
+# scenario -> name -> builder of the field evaluations of the scripts, timed
+# as script_<name>
+SCRIPTS = {
+    "helmholtz": {
+        "adaptive_grid": _adaptive(0.1, 40),
+    },
+    "2d_helmholtz": {
+        "plane_20^2": _plane(0.5, 20),
+        "plane_40^2": _plane(0.1, 40),
+    },
+    "braunbek": {
+        "plane_20^2": _plane(0.5, 20),
+        "field_lines": _field_lines(0.5, 2),
+        "field_lines_centre": _field_lines(0.2, 2),
+        "homogeneity": _homogeneity,
+    },
+    "scaled_braunbek": {
+        "field_lines": _field_lines(0.05, 2),
+    },
+    "3d_braunbek": {
+        "field_lines": _field_lines(0.05, 2),
+    },
+}
+
+# scenario -> animation name -> builder, timed as <name>_frames and <name>_figure
+ANIMATIONS = {
+    "3d_braunbek": {"currents": current_animation},
+    "scaled_braunbek": {"current": scaled_current_animation, "position": position_animation},
+}
+
+
+def run(full=False, repeat=3, only=None):
+    # import the plotting packages up front, not inside the first timing
+    import magpylib  # noqa: F401
+    import plotly.graph_objects  # noqa: F401
+
+    results = {}
+    for name, build in SCENARIOS.items():
+        if only and name not in only:
+            continue
+        timings = {}
+        timings["construct"], system = best_of(repeat, build)
+        timings["to_magpy"], _ = best_of(repeat, system.to_magpy)
+        for grid_name, (n, dims) in GRIDS.items():
+            if grid_name in FULL_ONLY and not full:
+                continue
+            points = grid(system, n, dims)
+            # the big grids only once, they dominate the run time otherwise
+            timings[grid_name], _ = best_of(repeat if len(points) < 10**6 else 1,
+                                            lambda: system.getB(points))
+        for label, build_script in SCRIPTS.get(name, {}).items():
+            timings[f"script_{label}"], _ = best_of(repeat, build_script(system))
+        for label, build_animation in ANIMATIONS.get(name, {}).items():
+            animation = build_animation(system)
+            timings[f"{label}_frames"], fig = best_of(repeat, animation)
+            timings[f"{label}_figure"], html = best_of(repeat, fig.to_json)
+            timings[f"{label}_figure_bytes"] = len(html)
+        results[name] = timings
+        print(f"{name}: " + ", ".join(
+            f"{key}={value}" if key.endswith("_bytes") else f"{key}={value:.4f}s"
+            for key, value in timings.items()))
+    return results
+
+
+def compare(results, baseline, tolerance, min_seconds=0.002):
+    """Timings slower than baseline * (1 + tolerance), as (scenario, key, ratio).
+
+    Differences below min_seconds are timer noise and ignored.
+    """
+    slower = []
+    for name, timings in results.items():
+        for key, value in timings.items():
+            reference = baseline.get(name, {}).get(key)
+            if reference is None or key.endswith("_bytes") or reference <= 0:
+                continue
+            ratio = value / reference
+            if ratio > 1 + tolerance and value - reference > min_seconds:
+                slower.append((name, key, ratio))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the shipped coil scenarios")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--full", action="store_true", help="include the 200^3 grids")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-seconds", type=float, default=0.002)
+    parser.add_argument("--only", nargs="*", choices=list(SCENARIOS))
+    parser.add_argument("--profile", action="store_true",
+                        help="time the phases and write a trace, see profiling.py")
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiling.enable()
+
+    results = dict(
+        machine=dict(python=platform.python_version(), numpy=np.__version__,
+                     platform=platform.platform(), processor=platform.processor()),
+        scenarios=run(full=args.full, repeat=args.repeat, only=args.only),
+    )
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"No baseline yet, these results are the baseline now: {args.baseline}")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)["scenarios"]
+    slower = compare(results["scenarios"], baseline, args.tolerance, args.min_seconds)
+    for name, key, ratio in slower:
+        print(f"REGRESSION {name} {key}: {ratio:.2f}x the baseline")
+    if not slower:
+        print(f"No timing more than {args.tolerance:.0%} slower than the baseline")
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
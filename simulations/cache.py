@@ -0,0 +1,131 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+# Opt-in on-disk cache of field evaluations.
+#
+# Results are stored as .npy files named by a sha256 over the loop arrays
+# (radius, position, normal, current) and the query points, so the same
+# geometry on the same grid is found again in the next run no matter how the
+# system was built. The loops are sorted before hashing, the order in which
+# the coils were added does not matter.
+#
+# Set COILS_CACHE_DIR to enable the cache in cached_getB and
+# COILS_CACHE_MB to change its size limit. When the cache grows beyond the
+# limit the least recently used entries are removed, hits refresh the file
+# modification time that the eviction goes by.
+
+ENV_DIR = "COILS_CACHE_DIR"
+ENV_SIZE = "COILS_CACHE_MB"
+
+# bump when the evaluation changes in a way that invalidates old results
+VERSION = b"loopfield-1"
+
+
+def _canonical(array):
+    array = np.ascontiguousarray(array, dtype="<f8")
+    return str(array.shape).encode() + array.tobytes()
+
+
+def field_key(radius, position, normal, current, points):
+    """Hex digest identifying the field of the loops at points."""
+    radius = np.atleast_1d(np.asarray(radius, dtype=float))
+    position = np.reshape(np.asarray(position, dtype=float), (-1, 3))
+    normal = np.reshape(np.asarray(normal, dtype=float), (-1, 3))
+    normal = normal / np.linalg.norm(normal, axis=1, keepdims=True)
+    current = np.broadcast_to(np.asarray(current, dtype=float), radius.shape)
+
+    loops = np.column_stack((radius, position, normal, current))
+    loops = loops[np.lexsort(loops.T[::-1])]
+
+    digest = hashlib.sha256(VERSION)
+    digest.update(_canonical(loops))
+    digest.update(_canonical(points))
+    return digest.hexdigest()
+
+
+class FieldCache:
+    """Directory of cached field arrays with a size limit in bytes."""
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def get(self, key):
+        """Cached array or None."""
+        path = self._path(key)
+        try:
+            array = np.load(path)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        os.utime(path)
+        return array
+
+    def put(self, key, array):
+        # write to a temporary file first, readers never see half a file
+        handle, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "wb") as file:
+            np.save(file, array)
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def entries(self):
+        """(path, size, mtime) of all entries, least recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            os.remove(path)
+
+    def getB(self, system, points):
+        """system.getB(points) through the cache, system being a CoilSystem."""
+        points = np.asarray(points, dtype=float)
+        key = field_key(**system.loops(), points=points)
+        B = self.get(key)
+        if B is None:
+            B = system.getB(points)
+            self.put(key, B)
+        return B
+
+
+def default_cache():
+    """FieldCache configured by the environment, None if caching is off."""
+    directory = os.environ.get(ENV_DIR)
+    if not directory:
+        return None
+    return FieldCache(directory, max_bytes=int(float(os.environ.get(ENV_SIZE, 1024)) * 2**20))
+
+
+def cached_getB(system, points, cache=None):
+    """Field of a CoilSystem at points, cached when a cache is configured."""
+    cache = cache or default_cache()
+    if cache is None:
+        return system.getB(points)
+    return cache.getB(system, points)
@@ -0,0 +1,260 @@
+from math import sqrt
+
+import numpy as np
+
+from loopfield import loop_field, loop_jacobian, loops_from_magpy
+from profiling import span
+from symmetry import coaxial_sets, symmetric_field
+
+# From: https://gfzpublic.gfz-potsdam.de/rest/items/item_3142899_2/component/file_3169935/content
+ORIG_R1 = 0.780 # diameter of inner coils
+ORIG_R2 = 0.596 # diameter of outer coils
+ORIG_D1 = 0.108 # distance of inner coils
+ORIG_D2 = 0.330 # distance of outer coils
+
+AXES = {
+    "x": (1.0, 0.0, 0.0),
+    "y": (0.0, 1.0, 0.0),
+    "z": (0.0, 0.0, 1.0),
+}
+
+
+def _as_axis(axis):
+    axis = np.asarray(AXES.get(axis, axis) if isinstance(axis, str) else axis, dtype=float)
+    return axis / np.linalg.norm(axis)
+
+
+def _rotate(vectors, angle, axis):
+    # Rodrigues rotation of (n, 3) vectors by angle [deg] about axis
+    k = _as_axis(axis)
+    a = np.deg2rad(angle)
+    return (vectors * np.cos(a)
+            + np.cross(k, vectors) * np.sin(a)
+            + np.outer(vectors @ k, k) * (1 - np.cos(a)))
+
+
+class CoilSystem:
+    """Set of circular windings stored as flat arrays.
+
+    radius   (n,)    winding radii [m]
+    position (n, 3)  winding centres [m]
+    normal   (n, 3)  unit winding axes
+    current  (n,)    winding currents [A]
+    group    (n,)    independently driven circuit (e.g. one axis of a 3-axis set)
+    coil     (n,)    physical coil the winding belongs to, used for display
+
+    The arrays can be handed to the loopfield kernels directly, magpylib
+    objects are only created by to_magpy for plotting.
+    """
+
+    def __init__(self, radius, position, normal, current, group=None, coil=None):
+        self.radius = np.atleast_1d(np.asarray(radius, dtype=float))
+        n = len(self.radius)
+        self.position = np.reshape(np.asarray(position, dtype=float), (n, 3))
+        normal = np.reshape(np.asarray(normal, dtype=float), (n, 3))
+        self.normal = normal / np.linalg.norm(normal, axis=1, keepdims=True)
+        self.current = np.array(np.broadcast_to(np.asarray(current, dtype=float), (n,)))
+        self.group = np.zeros(n, dtype=int) if group is None else np.asarray(group, dtype=int)
+        self.coil = np.arange(n) if coil is None else np.asarray(coil, dtype=int)
+        self._sets = None
+        self._sets_key = None
+
+    def __len__(self):
+        return len(self.radius)
+
+    def __repr__(self):
+        return f"CoilSystem({len(self)} windings, {self.n_groups} groups, {self.n_coils} coils)"
+
+    @property
+    def n_groups(self):
+        return int(self.group.max()) + 1 if len(self) else 0
+
+    @property
+    def n_coils(self):
+        return int(self.coil.max()) + 1 if len(self) else 0
+
+    def loops(self):
+        """Keyword arguments for the loopfield kernels."""
+        return dict(radius=self.radius, position=self.position,
+                    normal=self.normal, current=self.current)
+
+    def getB(self, points, symmetric=True):
+        """Field [T] at points, shape (*points.shape[:-1], 3).
+
+        With symmetric the coaxial and mirror symmetries of the windings are
+        used to evaluate every distinct (r, z) pair only once, see symmetry.py.
+        """
+        with span("getB"):
+            if symmetric:
+                return symmetric_field(**self.loops(), points=points, sets=self._coaxial_sets())
+            return loop_field(**self.loops(), points=points)
+
+    def jacobian(self, points):
+        """Field gradient dB_i/dx_j [T/m] at points, shape (*points.shape[:-1], 3, 3)."""
+        with span("jacobian"):
+            return loop_jacobian(**self.loops(), points=points)
+
+    def _coaxial_sets(self):
+        # symmetry detection is cached, the key notices changes made in place
+        key = b"".join(a.tobytes() for a in (self.radius, self.position, self.normal, self.current))
+        if key != self._sets_key:
+            self._sets = coaxial_sets(**self.loops())
+            self._sets_key = key
+        return self._sets
+
+    def copy(self, **changes):
+        arrays = dict(radius=self.radius, position=self.position, normal=self.normal,
+                      current=self.current, group=self.group, coil=self.coil)
+        arrays.update(changes)
+        return CoilSystem(**{k: np.array(v) for k, v in arrays.items()})
+
+    def select(self, index):
+        """Copy with only the windings at index (indices or boolean mask)."""
+        return self.copy(radius=self.radius[index], position=self.position[index],
+                         normal=self.normal[index], current=self.current[index],
+                         group=self.group[index], coil=self.coil[index])
+
+    def with_currents(self, currents):
+        """Copy with one current per group, applied to all of its windings."""
+        currents = np.broadcast_to(np.asarray(currents, dtype=float), (self.n_groups,))
+        return self.copy(current=currents[self.group])
+
+    def rotated(self, angle, axis, anchor=(0, 0, 0)):
+        """Copy rotated by angle [deg] about axis through anchor."""
+        anchor = np.asarray(anchor, dtype=float)
+        return self.copy(position=_rotate(self.position - anchor, angle, axis) + anchor,
+                         normal=_rotate(self.normal, angle, axis))
+
+    def moved(self, displacement):
+        return self.copy(position=self.position + np.asarray(displacement, dtype=float))
+
+    @classmethod
+    def concat(cls, *systems):
+        """Join systems, each one keeps its own groups and coils."""
+        group_offset = np.cumsum([0] + [s.n_groups for s in systems[:-1]])
+        coil_offset = np.cumsum([0] + [s.n_coils for s in systems[:-1]])
+        return cls(
+            radius=np.concatenate([s.radius for s in systems]),
+            position=np.concatenate([s.position for s in systems]),
+            normal=np.concatenate([s.normal for s in systems]),
+            current=np.concatenate([s.current for s in systems]),
+            group=np.concatenate([s.group + o for s, o in zip(systems, group_offset)]),
+            coil=np.concatenate([s.coil + o for s, o in zip(systems, coil_offset)]),
+        )
+
+    @classmethod
+    def series(cls, *systems):
+        """Join systems into one circuit, each one becomes a coil of group 0."""
+        joined = cls.concat(*(s.copy(coil=np.zeros(len(s), dtype=int)) for s in systems))
+        return joined.copy(group=np.zeros(len(joined), dtype=int))
+
+    @classmethod
+    def from_magpy(cls, *parts):
+        """System from magpylib objects, every part becomes one group.
+
+        The children of a part (or the part itself for a bare Circle) are its coils.
+        """
+        import magpylib as magpy
+
+        systems = []
+        for part in parts:
+            children = part.children if isinstance(part, magpy.Collection) else [part]
+            coils = [loops_from_magpy(child) for child in children]
+            systems.append(cls(
+                radius=np.concatenate([c["radius"] for c in coils]),
+                position=np.concatenate([c["position"] for c in coils]),
+                normal=np.concatenate([c["normal"] for c in coils]),
+                current=np.concatenate([c["current"] for c in coils]),
+                coil=np.repeat(np.arange(len(coils)), [len(c["radius"]) for c in coils]),
+            ))
+        return cls.concat(*systems)
+
+    def to_magpy(self, colors=None):
+        """Nested magpy.Collection: groups > coils > Circles."""
+        import magpylib as magpy
+        from scipy.spatial.transform import Rotation
+
+        # rotation that takes the Circle's z-axis onto the winding normal
+        z = np.array([0.0, 0.0, 1.0])
+        rotvec = np.cross(z, self.normal)
+        sin = np.linalg.norm(rotvec, axis=1)
+        angle = np.arctan2(sin, self.normal @ z)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rotvec = np.where(sin[:, None] > 0, rotvec / sin[:, None], (1.0, 0.0, 0.0))
+        orientations = Rotation.from_rotvec(rotvec * angle[:, None])
+
+        groups = []
+        for g in range(self.n_groups):
+            coils = []
+            for c in np.unique(self.coil[self.group == g]):
+                coil = magpy.Collection()
+                for i in np.flatnonzero((self.group == g) & (self.coil == c)):
+                    coil.add(magpy.current.Circle(
+                        current=self.current[i],
+                        diameter=2 * self.radius[i],
+                        position=self.position[i],
+                        orientation=orientations[i],
+                    ))
+                coils.append(coil)
+            group = magpy.Collection(*coils)
+            if colors is not None:
+                group.set_children_styles(color=colors[g])
+            groups.append(group)
+        return magpy.Collection(*groups)
+
+
+def _coaxial(diameters, distances, current, axis, coil=None):
+    axis = _as_axis(axis)
+    distances = np.asarray(distances, dtype=float)
+    n = len(distances)
+    return CoilSystem(
+        radius=np.asarray(diameters, dtype=float) / 2,
+        position=distances[:, None] * axis,
+        normal=np.broadcast_to(axis, (n, 3)),
+        current=current,
+        coil=coil,
+    )
+
+
+def braunbek_from_dims(inner_diameter, outer_diameter, inner_distance, outer_distance,
+                       current=1, axis="z"):
+    """Four-coil Braunbek system, coils at +outer, +inner, -inner, -outer along axis."""
+    return _coaxial(
+        diameters=(outer_diameter, inner_diameter, inner_diameter, outer_diameter),
+        distances=(outer_distance, inner_distance, -inner_distance, -outer_distance),
+        current=current,
+        axis=axis,
+    )
+
+
+def braunbek(scale, current=1, axis="z"):
+    """GFZ reference Braunbek design scaled by scale (e.g. 0.030/ORIG_D1)."""
+    return braunbek_from_dims(ORIG_R1 * scale, ORIG_R2 * scale, ORIG_D1 * scale,
+                              ORIG_D2 * scale, current=current, axis=axis)
+
+
+def helmholtz(diameter, windings=4, wire_diameter=0.001, current=1, axis="z"):
+    """Finite sized Helmholtz pair with the winding layout of 1d_helmholtz.py.
+
+    Each coil holds int(sqrt(windings))**2 turns, growing outwards in diameter
+    by wire_diameter per layer and along the axis by wire_diameter per turn,
+    starting at +/-diameter/4. All lengths in [m].
+    """
+    n = int(sqrt(windings))
+    n1, n2 = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    diameters = (diameter + n2 * wire_diameter).ravel()
+    offsets = ((n1 + 0.5) * wire_diameter).ravel()
+    return _coaxial(
+        diameters=np.concatenate((diameters, diameters)),
+        distances=np.concatenate((diameter / 4 + offsets, -diameter / 4 + offsets)),
+        current=current,
+        axis=axis,
+        coil=np.repeat((0, 1), n * n),
+    )
+
+
+def three_axis_braunbek(scales, currents=(1, 1, 1), axes=("z", "y", "x")):
+    """Nested 3-axis Braunbek set, one group per axis."""
+    return CoilSystem.concat(*(
+        braunbek(scale, current, axis) for scale, current, axis in zip(scales, currents, axes)
+    ))
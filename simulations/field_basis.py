@@ -0,0 +1,63 @@
+import numpy as np
+
+from profiling import span
+
+# The field of a coil system is linear in the current of each independently
+# driven part. Evaluating every part once at unit current gives a basis from
+# which the field for any set of currents is a single matrix product.
+#
+# The parts are the groups of a CoilSystem or a list of magpylib objects.
+
+
+def _windings(part):
+    import magpylib as magpy
+
+    # Collections hold their current sources below them, a bare Circle is its own winding
+    return part.sources_all if isinstance(part, magpy.Collection) else [part]
+
+
+def _system_basis(system, points, drive):
+    # every group with its own winding currents, the others switched off. The
+    # winding currents can differ within a group (winding packs keep their
+    # quadrature weights in them), so they are scaled, not overwritten.
+    drive = np.broadcast_to(np.asarray(drive, dtype=float), (system.n_groups,))
+    columns = []
+    for g in range(system.n_groups):
+        part = system.copy(current=np.where(system.group == g, system.current, 0.0) / drive[g])
+        columns.append(part.getB(points))
+    return np.stack(columns, axis=-1)
+
+
+def field_basis(parts, points, drive=1.0):
+    """Field of each part at 1 A, shape (*points.shape[:-1], 3, len(parts)).
+
+    parts is a CoilSystem, then every group is one part and drive holds the
+    drive current [A] per group the system was built with (1 A for the
+    builders' defaults), or a list of magpylib objects whose windings are all
+    assumed to carry the same (drive) current. The currents of magpylib parts
+    are restored afterwards.
+    """
+    points = np.asarray(points, dtype=float)
+    if hasattr(parts, "n_groups"):
+        return _system_basis(parts, points, drive)
+
+    import magpylib as magpy
+
+    columns = []
+    for part in parts:
+        windings = _windings(part)
+        saved = [winding.current for winding in windings]
+        for winding in windings:
+            winding.current = 1
+        try:
+            with span("getB"):
+                columns.append(magpy.getB(part, points))
+        finally:
+            for winding, current in zip(windings, saved):
+                winding.current = current
+    return np.stack(columns, axis=-1)
+
+
+def superpose(basis, currents):
+    """Field for the given part currents from a basis computed by field_basis."""
+    return basis @ np.asarray(currents, dtype=float)
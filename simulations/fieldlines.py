@@ -0,0 +1,339 @@
+import numpy as np
+
+from interpolant import FieldInterpolant
+
+# Field lines traced with the true coil field.
+#
+# All seed lines are integrated at once along the arc length s,
+#   dx/ds = B(x) / |B(x)|,
+# with an adaptive Dormand-Prince 5(4) scheme. Every stage is one getB call on
+# the positions of all lines that are still running, so the source can be a
+# CoilSystem, a magpylib object or a FieldInterpolant. Each line has its own
+# step size, it stops when it leaves the box, reaches max_length, runs into a
+# field null or a wire (step size collapses), or after max_steps.
+#
+# plane_field_lines spreads lines evenly over a plane the way streamplot
+# does: the in-plane field is followed, the plane is split into cells and a
+# line stops when it enters a cell another line already passed through.
+#
+# The result are polylines with the field magnitude at their points, ready for
+# matplotlib (line_collection) or plotly (join_lines gives one NaN separated
+# array for a single Scatter trace). plot_field_lines draws them in place of
+# the streamplots of the scripts, traced through a FieldInterpolant of the
+# plane so that the coils are only evaluated once per grid point.
+
+# Embedded Runge-Kutta pairs with the first-same-as-last property: the last
+# row of A are the weights of the higher order solution, where the last stage
+# is evaluated, "low" the weights of the embedded lower order one.
+METHODS = {
+    "dopri5": dict(
+        A=[
+            [],
+            [1/5],
+            [3/40, 9/40],
+            [44/45, -56/15, 32/9],
+            [19372/6561, -25360/2187, 64448/6561, -212/729],
+            [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+            [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84],
+        ],
+        low=[5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40],
+        order=4,
+    ),
+    "bs23": dict(
+        A=[
+            [],
+            [1/2],
+            [0, 3/4],
+            [2/9, 1/3, 4/9],
+        ],
+        low=[7/24, 1/4, 1/3, 1/8],
+        order=2,
+    ),
+}
+
+
+def _direction(source, points, sign):
+    # unit field direction times sign and the magnitude, zero at field nulls
+    B = np.reshape(source.getB(points), (-1, 3))
+    norm = np.linalg.norm(B, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        unit = np.where(norm[:, None] > 0, B / norm[:, None], 0.0)
+    return sign[:, None] * unit, norm
+
+
+class _Cells:
+    # cells of a plane: owner is the id of the line that claimed a cell or -1,
+    # visited the lowest id of the lines traced through it in the current round
+    def __init__(self, lower, upper, n):
+        self.axes = np.flatnonzero(upper > lower)
+        self.lower = lower[self.axes]
+        self.size = (upper - lower)[self.axes] / n
+        self.n = n
+        self.owner = np.full(n * n, -1)
+        self.visited = np.full(n * n, np.iinfo(int).max)
+
+    def __call__(self, points):
+        index = ((points[:, self.axes] - self.lower) / self.size).astype(int)
+        return np.ravel_multi_index(tuple(np.clip(index, 0, self.n - 1).T), (self.n, self.n))
+
+
+class _InPlane:
+    # the field projected onto the plane, like streamplot only the in-plane
+    # components are followed and the lines cannot leave the plane
+    def __init__(self, source, axes):
+        self.source = source
+        self.fixed = np.setdiff1d(np.arange(3), axes)
+
+    def getB(self, points):
+        B = np.reshape(self.source.getB(points), (-1, 3))
+        B[:, self.fixed] = 0
+        return B
+
+
+def _trace(source, seeds, sign, lower, upper, step, min_step, tol, max_length, max_steps, method,
+           cells=None, ids=None):
+    A, low = METHODS[method]["A"], METHODS[method]["low"]
+    exponent = 1 / (METHODS[method]["order"] + 1)
+    n = len(seeds)
+    x = seeds.copy()
+    k1, norm = _direction(source, x, sign)
+    h = np.full(n, step)
+    length = np.zeros(n)
+    active = np.flatnonzero(norm > 0)
+    if cells is not None:
+        previous = cells(seeds)
+        np.minimum.at(cells.visited, previous, ids)
+        # steps spent in the current cell, lines circling inside one cell
+        # (around a wire) are stopped
+        staying = np.zeros(n, dtype=int)
+        max_staying = 50
+
+    # accepted points as (line, point, |B|) chunks, in order per line
+    lines = [np.arange(n)]
+    points = [seeds.copy()]
+    norms = [norm]
+
+    for _ in range(max_steps):
+        if not len(active):
+            break
+        xa, ha, sa, k = x[active], h[active], sign[active], [k1[active]]
+        for row in A[1:]:
+            y = xa + ha[:, None] * sum(a * kj for a, kj in zip(row, k) if a)
+            ks, norm_new = _direction(source, y, sa)
+            k.append(ks)
+        # the last stage was evaluated at the higher order solution
+        y_low = xa + ha[:, None] * sum(b * kj for b, kj in zip(low, k) if b)
+        error = np.linalg.norm(y - y_low, axis=1)
+
+        accept = error <= tol
+        with np.errstate(divide="ignore"):
+            factor = np.clip(0.9 * (tol / error) ** exponent, 0.2, 5.0)
+        h_new = np.minimum(ha * factor, step)
+
+        done = h_new < min_step
+        idx = active[accept]
+        if len(idx):
+            new = y[accept]
+            x[idx] = new
+            k1[idx] = k[-1][accept]
+            length[idx] += ha[accept]
+            lines.append(idx)
+            points.append(new)
+            norms.append(norm_new[accept])
+            stop = (np.any((new < lower) | (new > upper), axis=1)
+                    | (length[idx] >= max_length) | (norm_new[accept] == 0))
+            if cells is not None:
+                # stop at claimed cells, cells of lines before this one and
+                # when coming back to an own cell (closed line)
+                cell = cells(new)
+                moved = cell != previous[idx]
+                staying[idx] = np.where(moved, 0, staying[idx] + 1)
+                stop |= ((cells.owner[cell] >= 0) | (moved & (cells.visited[cell] <= ids[idx]))
+                         | (staying[idx] > max_staying))
+                np.minimum.at(cells.visited, cell, ids[idx])
+                previous[idx] = cell
+            done[accept] |= stop
+        h[active] = h_new
+        active = active[~done]
+
+    line = np.concatenate(lines)
+    order = np.argsort(line, kind="stable")
+    split = np.cumsum(np.bincount(line, minlength=n))[:-1]
+    return (np.split(np.concatenate(points)[order], split),
+            np.split(np.concatenate(norms)[order], split))
+
+
+def _settings(lower, upper, step, max_length, rtol, max_steps, method):
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {list(METHODS)}")
+    size = np.linalg.norm(upper - lower)
+    return dict(
+        method=method,
+        lower=lower,
+        upper=upper,
+        step=size / 100 if step is None else step,
+        min_step=1e-9 * size,
+        tol=rtol * size,
+        max_length=4 * size if max_length is None else max_length,
+        max_steps=max_steps,
+    )
+
+
+def _join(traced, norms, n):
+    # lines 0..n-1 forward, n..2n-1 backward from the same seeds
+    lines = [np.concatenate((b[:0:-1], f)) for f, b in zip(traced[:n], traced[n:])]
+    norms = [np.concatenate((b[:0:-1], f)) for f, b in zip(norms[:n], norms[n:])]
+    return lines, norms
+
+
+def trace_field_lines(source, seeds, lower=None, upper=None, direction="both", step=None,
+                      max_length=None, rtol=1e-5, max_steps=2000, method="dopri5"):
+    """Field lines through seeds (n, 3), as lists of (k, 3) points and (k,) |B|.
+
+    lower, upper  box the lines stay in, default the bounding box of the seeds
+    direction     "forward" (along B), "backward" or "both"
+    step          initial and largest step [m], default 1/100 of the box size
+    max_length    longest line per direction [m], default 4 times the box size
+    rtol          position error per step relative to the box size
+    method        Runge-Kutta pair from METHODS
+    """
+    seeds = np.reshape(np.asarray(seeds, dtype=float), (-1, 3))
+    lower = seeds.min(axis=0) if lower is None else np.asarray(lower, dtype=float)
+    upper = seeds.max(axis=0) if upper is None else np.asarray(upper, dtype=float)
+    settings = _settings(lower, upper, step, max_length, rtol, max_steps, method)
+    n = len(seeds)
+
+    if direction in ("forward", "backward"):
+        sign = np.full(n, 1.0 if direction == "forward" else -1.0)
+        return _trace(source, seeds, sign, **settings)
+    if direction != "both":
+        raise ValueError(f"Unknown direction {direction!r}, expected forward, backward or both")
+    sign = np.repeat((1.0, -1.0), n)
+    traced, norms = _trace(source, np.concatenate((seeds, seeds)), sign, **settings)
+    return _join(traced, norms, n)
+
+
+def plane_seeds(lower, upper, n):
+    """n x n seeds on a regular grid of the plane between lower and upper.
+
+    One coordinate of lower and upper has to be equal, e.g. x=0 for a
+    yz-plane, the seeds sit in the cell centres.
+    """
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    axes = [lo + (np.arange(n) + 0.5) / n * (hi - lo) if hi > lo else np.array([lo])
+            for lo, hi in zip(lower, upper)]
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+
+
+def plane_field_lines(source, lower, upper, density=1, min_length=0.1, step=None,
+                      max_length=None, rtol=1e-5, max_steps=2000, method="bs23"):
+    """Evenly spread field lines in the plane between lower and upper.
+
+    Like streamplot only the in-plane field components are followed, the
+    plane is divided into 30 * density cells per side and a line stops when
+    it enters a cell taken by another line. Seeds are
+    started from every 4th, then every 2nd, then every free cell, so the
+    first lines are long and the later ones fill the gaps. Lines shorter than
+    min_length times the plane size are dropped. The steps are limited to
+    the cell size, so the third order method is accurate enough by default.
+    """
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    n = max(1, int(30 * density))
+    cells = _Cells(lower, upper, n)
+    source = _InPlane(source, cells.axes)
+    if step is None:
+        step = cells.size.min()
+    settings = _settings(lower, upper, step, max_length, rtol, max_steps, method)
+
+    seeds = plane_seeds(lower, upper, n)
+    index = np.stack(np.meshgrid(np.arange(n), np.arange(n), indexing="ij"), axis=-1).reshape(-1, 2)
+    lines, norms = [], []
+    next_id = 0
+    for stride in (4, 2, 1):
+        chunk = seeds[np.all(index % stride == stride // 2, axis=1)]
+        chunk = chunk[cells.owner[cells(chunk)] < 0]
+        if not len(chunk):
+            continue
+        # the lines of a round are traced together and stop at the cells of
+        # lines with a lower id, then they are cut one after the other where
+        # they meet a cell claimed by a line before them, like streamplot does
+        m = len(chunk)
+        ids = np.tile(np.arange(next_id, next_id + m), 2)
+        cells.visited[:] = np.iinfo(int).max
+        traced, traced_norms = _trace(source, np.concatenate((chunk, chunk)),
+                                      np.repeat((1.0, -1.0), m), cells=cells, ids=ids, **settings)
+        for i in range(m):
+            parts = []
+            for part, norm in ((traced[i], traced_norms[i]), (traced[m + i], traced_norms[m + i])):
+                cell = cells(part)
+                owner = cells.owner[cell]
+                taken = np.flatnonzero((owner >= 0) & (owner != next_id))
+                end = taken[0] if len(taken) else len(part)
+                parts.append((part[:end], norm[:end]))
+                cells.owner[cell[:end]] = next_id
+            next_id += 1
+            (forward, forward_norm), (backward, backward_norm) = parts
+            if len(forward) and len(backward):
+                lines.append(np.concatenate((backward[:0:-1], forward)))
+                norms.append(np.concatenate((backward_norm[:0:-1], forward_norm)))
+
+    shortest = min_length * np.linalg.norm(upper - lower) / np.sqrt(2)
+    keep = [np.sum(np.linalg.norm(np.diff(line, axis=0), axis=1)) >= shortest for line in lines]
+    return ([line for line, k in zip(lines, keep) if k],
+            [norm for norm, k in zip(norms, keep) if k])
+
+
+def line_collection(lines, norms, axes=(1, 2), **kwargs):
+    """matplotlib LineCollection of the lines projected onto axes, colored by |B|."""
+    from matplotlib.collections import LineCollection
+
+    segments = [np.stack((line[:-1, axes], line[1:, axes]), axis=1) for line in lines if len(line) > 1]
+    values = [(norm[:-1] + norm[1:]) / 2 for line, norm in zip(lines, norms) if len(line) > 1]
+    if not segments:
+        return LineCollection([], **kwargs)
+    collection = LineCollection(np.concatenate(segments), **kwargs)
+    collection.set_array(np.concatenate(values))
+    return collection
+
+
+def join_lines(lines):
+    """All lines as one (k, 3) array separated by NaN rows, for a single plotly trace."""
+    gap = np.full((1, 3), np.nan)
+    return np.concatenate([part for line in lines for part in (line, gap)])
+
+
+def plot_field_lines(ax, source, lower, upper, density=2, grid=100, linewidth=3, cmap="coolwarm",
+                     label="(T)"):
+    """Field lines of source in the plane between lower and upper, drawn into ax.
+
+    Styled like the streamplots of the scripts: the color is |B| relative to
+    its largest value on the lines, the width sqrt of that times linewidth,
+    with a colorbar labelled label. The field is sampled on grid x grid
+    points of the plane once and the lines are traced through a tricubic
+    FieldInterpolant of it. Returns the LineCollection.
+    """
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    axes = tuple(np.flatnonzero(upper > lower))
+    # the interpolant needs a volume, one grid spacing across the plane, and
+    # a margin in the plane for the Runge-Kutta stages of the last steps
+    # before a line leaves it (the steps are at most 1/30 of the plane)
+    span = upper - lower
+    margin = np.where(span > 0, span / 20, np.amax(span) / (grid - 1))
+    shape = np.where(span > 0, grid, 2)
+    field = FieldInterpolant.from_source(source, lower - margin, upper + margin, shape)
+
+    lines, norms = plane_field_lines(field, lower, upper, density=density)
+    if lines:
+        Bmax = max(np.amax(norm) for norm in norms)
+        norms = [norm / Bmax for norm in norms]
+    # round caps close the gaps between the segments of the wide lines
+    collection = line_collection(lines, norms, axes=axes, cmap=cmap, capstyle="round")
+    if lines:
+        collection.set_linewidth(np.sqrt(collection.get_array()) * linewidth)
+        ax.figure.colorbar(collection, ax=ax, label=label)
+    ax.add_collection(collection)
+    ax.set(xlim=(lower[axes[0]], upper[axes[0]]), ylim=(lower[axes[1]], upper[axes[1]]))
+    return collection
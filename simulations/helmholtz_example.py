@@ -2,6 +2,8 @@ import numpy as np
 import magpylib as magpy
 import matplotlib.pyplot as plt
 
+from loopfield import loop_field, loops_from_magpy
+
 # Create a finite sized Helmholtz coil-pair
 coil1 = magpy.Collection()
 for z in np.linspace(-1, 1, 5):
@@ -26,7 +28,7 @@ fig, ax = plt.subplots(1, 1, figsize=(6,5))
 grid = np.mgrid[0:0:1j, -13:13:20j, -13:13:20j].T[:,:,0]
 _, Y, Z = np.moveaxis(grid, 2, 0)
 
-B = magpy.getB(helmholtz, grid)
+B = loop_field(**loops_from_magpy(helmholtz), points=grid)
 _, By, Bz = np.moveaxis(B, 2, 0)
 
 Bamp = np.linalg.norm(B, axis=2)
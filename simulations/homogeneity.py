@@ -0,0 +1,161 @@
+import numpy as np
+
+# Field homogeneity figures of merit for any source with a getB(points)
+# method (CoilSystem, magpylib objects and collections).
+#
+# The relative deviation |B - B0| / |B0| from the centre field B0 is a
+# subharmonic function in the current free region: its maximum over a sphere
+# or box is always reached on the surface. Peak deviations are therefore
+# computed from surface samples only and the homogeneous region is found by
+# a radial search from the centre, with one batched getB call per step.
+
+
+def sphere_points(n):
+    """n evenly spread unit vectors (Fibonacci lattice)."""
+    i = np.arange(n) + 0.5
+    phi = np.arccos(1 - 2 * i / n)
+    theta = np.pi * (1 + 5**0.5) * i
+    return np.stack((np.cos(theta) * np.sin(phi), np.sin(theta) * np.sin(phi), np.cos(phi)), axis=1)
+
+
+def box_points(n):
+    """About n points spread evenly over the surface of the cube [-1, 1]^3."""
+    m = max(2, int(round(np.sqrt(n / 6))))
+    u, v = np.meshgrid(np.linspace(-1, 1, m), np.linspace(-1, 1, m))
+    u, v = u.ravel(), v.ravel()
+    faces = []
+    for axis in range(3):
+        for side in (-1.0, 1.0):
+            face = np.empty((len(u), 3))
+            face[:, axis] = side
+            face[:, [a for a in range(3) if a != axis]] = np.stack((u, v), axis=1)
+            faces.append(face)
+    return np.unique(np.concatenate(faces), axis=0)
+
+
+def deviation(source, points, center=(0, 0, 0)):
+    """Relative deviation |B - B0| / |B0| at points from the field B0 at center."""
+    center = np.asarray(center, dtype=float)
+    points = np.asarray(points, dtype=float)
+    B = source.getB(np.vstack((center, points.reshape(-1, 3))))
+    B0 = B[0]
+    dev = np.linalg.norm(B[1:] - B0, axis=1) / np.linalg.norm(B0)
+    return dev.reshape(points.shape[:-1])
+
+
+def peak_deviation(source, size, shape="sphere", center=(0, 0, 0), n=400):
+    """Largest relative deviation inside a sphere (radius size) or box.
+
+    For a box, size is the half width, a scalar or one value per axis.
+    """
+    center = np.asarray(center, dtype=float)
+    if shape == "sphere":
+        # the axis points are added as that is where the extremes of coaxial systems lie
+        surface = size * np.vstack((sphere_points(n), np.eye(3), -np.eye(3)))
+    elif shape == "box":
+        surface = np.asarray(size, dtype=float) * box_points(n)
+    else:
+        raise ValueError(f"Unknown shape {shape!r}, expected 'sphere' or 'box'")
+    return np.amax(deviation(source, center + surface, center))
+
+
+def _default_extent(source, center):
+    # distance from the centre to the closest winding of a CoilSystem
+    if not (hasattr(source, "radius") and hasattr(source, "position")):
+        raise ValueError("r_max is required for sources other than CoilSystem")
+    d = source.position - center
+    z = np.einsum("ni,ni->n", d, source.normal)
+    r = np.linalg.norm(d - z[:, None] * source.normal, axis=1)
+    return np.amin(np.hypot(r - source.radius, z))
+
+
+def homogeneous_region(source, ppm, center=(0, 0, 0), r_max=None, directions=200,
+                       growth=1.25, rtol=1e-3, check=4000):
+    """Extent of the region around center with a deviation below ppm.
+
+    Along each of the sampled directions the first radius where the deviation
+    exceeds the limit is found by growing the radius geometrically from the
+    centre and bisecting the last step. The smallest of them can still miss
+    a dip of the region between the directions, so the sphere is checked with
+    peak_deviation on check points and shrunk until it holds. Returns a dict with
+      radius  radius of the largest sphere inside the region
+      volume  volume of the (star shaped) region
+      extent  radius reached along each direction, shape (directions,)
+    """
+    center = np.asarray(center, dtype=float)
+    limit = ppm * 1e-6
+    if r_max is None:
+        r_max = _default_extent(source, center)
+    dirs = sphere_points(directions)
+
+    # grow until the limit is exceeded or r_max is reached
+    good = np.zeros(directions)
+    bad = np.full(directions, np.inf)
+    r = np.full(directions, r_max * 1e-3)
+    active = np.ones(directions, dtype=bool)
+    while np.any(active):
+        dev = deviation(source, center + r[active, None] * dirs[active], center)
+        idx = np.flatnonzero(active)
+        exceeded = dev > limit
+        bad[idx[exceeded]] = r[idx[exceeded]]
+        good[idx[~exceeded]] = r[idx[~exceeded]]
+        at_max = r >= r_max
+        active[idx[exceeded]] = False
+        active &= ~at_max
+        r = np.minimum(r * growth, r_max)
+
+    # bisect between the last good and first bad radius
+    open_ = np.isfinite(bad)
+    while np.any(open_ & (bad - good > rtol * bad)):
+        idx = np.flatnonzero(open_ & (bad - good > rtol * bad))
+        mid = (good[idx] + bad[idx]) / 2
+        exceeded = deviation(source, center + mid[:, None] * dirs[idx], center) > limit
+        bad[idx[exceeded]] = mid[exceeded]
+        good[idx[~exceeded]] = mid[~exceeded]
+
+    # the deviation grows at least quadratically with the radius, so shrinking
+    # by the square root of the excess gets below the limit in a step or two
+    radius = np.amin(good)
+    peak = peak_deviation(source, radius, "sphere", center, check)
+    while peak > limit:
+        radius *= np.sqrt(limit / peak) * (1 - rtol)
+        peak = peak_deviation(source, radius, "sphere", center, check)
+
+    return dict(
+        radius=radius,
+        volume=4 / 3 * np.pi * np.mean(good**3),
+        extent=good,
+    )
+
+
+def deviation_histogram(source, size, shape="sphere", center=(0, 0, 0), n=20000,
+                        bins=None, seed=0):
+    """Histogram of the relative deviation [ppm] over the volume of a sphere or box.
+
+    Points are drawn uniformly from the volume. Returns (counts, bin_edges),
+    by default with logarithmic bins from 0.01ppm to the largest deviation.
+    """
+    center = np.asarray(center, dtype=float)
+    rng = np.random.default_rng(seed)
+    if shape == "sphere":
+        points = sphere_points(n)[rng.permutation(n)] * size * rng.random((n, 1)) ** (1 / 3)
+    elif shape == "box":
+        points = np.asarray(size, dtype=float) * rng.uniform(-1, 1, (n, 3))
+    else:
+        raise ValueError(f"Unknown shape {shape!r}, expected 'sphere' or 'box'")
+
+    dev = deviation(source, center + points, center) * 1e6
+    if bins is None:
+        bins = np.geomspace(1e-2, max(np.amax(dev), 1e-1), 41)
+    return np.histogram(dev, bins=bins)
+
+
+def compare(sources, ppm=(10, 100, 1000), center=(0, 0, 0), r_max=None):
+    """Print the homogeneous radius and volume of several named sources."""
+    print(f"{'':>12}" + "".join(f"{f'{p}ppm radius':>16}{f'{p}ppm volume':>18}" for p in ppm))
+    for name, source in sources.items():
+        line = f"{name:>12}"
+        for p in ppm:
+            region = homogeneous_region(source, p, center, r_max)
+            line += f"{region['radius']*1000:>14.2f}mm{region['volume']*1e6:>16.3f}cm3"
+        print(line)
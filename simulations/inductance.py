@@ -0,0 +1,250 @@
+import numpy as np
+
+from coilsystem import ORIG_D1, CoilSystem, three_axis_braunbek
+from loopfield import CHUNK, MU0, _cel_iter, _unit
+from symmetry import coaxial_sets
+
+# Self and mutual inductances of coil systems from their loops.
+#
+# Two coaxial loops with radii a, b at axial distance d have Maxwell's mutual
+# inductance
+#   M = mu0 sqrt(ab) [(2/k - k) K(k) - 2/k E(k)],  k^2 = 4ab / ((a+b)^2 + d^2).
+# The bracket equals k^2/2 cel(kc, 1, -1, 1) with Bulirsch's cel and the
+# complementary modulus kc, which avoids the cancellation between K and E for
+# distant loops, so
+#   M = mu0 sqrt(ab) k cel(kc, 1, -1, 1).
+# Loops that are not coaxial use Neumann's double line integral with the
+# inner integral in closed form, the azimuthal vector potential of the source
+# loop A = mu0 / (2 pi) k sqrt(a/r) cel(kc, 1, -1, 1), and the outer one
+#   M = integral A . dl
+# by the trapezoidal rule over n points of the other loop, which converges
+# exponentially for a periodic integrand, the faster the larger the clearance
+# between the loops relative to the radius. The error falls roughly like
+# exp(-n asinh(clearance / radius)), so by default n is chosen for every pair
+# of loops as the power of two of at least STEPS / asinh(clearance / radius),
+# which keeps it below about 1e-9 mu0 sqrt(ab) for tilted and offset pairs.
+# Close pairs get more points, distant ones fewer. A single turn with wire
+# radius rho
+# has the self inductance mu0 a (ln(8a/rho) - 7/4).
+#
+# The loops are split into coaxial sets like in symmetry.py. All turn pairs
+# within a set are one closed form array operation, the pairs between two sets
+# one quadrature over (loops, loops, n) arrays, both in chunks. The currents
+# of the system are the loop currents per ampere of coil current, so every
+# turn of a system built at the default 1 A counts once and the sign folds in
+# the winding direction.
+
+# quadrature points per loop times asinh(clearance / radius), and the bounds of n
+STEPS = 40
+N_MIN, N_MAX = 8, 4096
+# points per loop for the clearance estimate
+N_COARSE = 64
+
+
+def _cel(kc, c, s):
+    # Bulirsch cel(kc, 1, c, s) for arrays of kc in (0, 1], the first step of
+    # the algorithm here and the iteration shared with the loop field
+    qc = np.ravel(kc)
+    cel = _cel_iter(qc, 1 + qc, (np.full(qc.shape, c + s),), (2 * (s + c * qc),))
+    return cel[0].reshape(np.shape(kc))
+
+
+def _moduli(a, r, z):
+    # k and kc of a loop of radius a seen from cylindrical (r, z)
+    x0 = (a + r) ** 2 + z**2
+    return np.sqrt(4 * a * r / x0), np.sqrt(((a - r) ** 2 + z**2) / x0)
+
+
+def coaxial_mutual(a, b, d):
+    """Mutual inductance [H] of coaxial loops, radii a, b at axial distance d."""
+    a, b, d = np.broadcast_arrays(*(np.abs(np.asarray(x, dtype=float)) for x in (a, b, d)))
+    k, kc = _moduli(a, b, d)
+    return MU0 * np.sqrt(a * b) * k * _cel(kc, -1.0, 1.0)
+
+
+def self_inductance(radius, wire_radius):
+    """Low frequency inductance [H] of a single round wire turn."""
+    radius = np.asarray(radius, dtype=float)
+    return MU0 * radius * (np.log(8 * radius / wire_radius) - 7 / 4)
+
+
+def _frame(normal):
+    # unit vectors u, v with u x v = normal
+    helper = np.where(np.abs(normal[..., :1]) < 0.9, (1.0, 0.0, 0.0), (0.0, 1.0, 0.0))
+    u = _unit(np.cross(normal, helper))
+    return u, np.cross(normal, u)
+
+
+def _loop_points(radius, position, normal, n):
+    # n points and line elements on each loop, (loops, n, 3)
+    t = 2 * np.pi * np.arange(n) / n
+    u, v = _frame(normal)
+    cos, sin = np.cos(t)[None, :, None], np.sin(t)[None, :, None]
+    points = position[:, None] + radius[:, None, None] * (cos * u[:, None] + sin * v[:, None])
+    dl = (2 * np.pi / n) * radius[:, None, None] * (cos * v[:, None] - sin * u[:, None])
+    return points, dl
+
+
+def _in_set_frame(s, points, dl=None):
+    # cylindrical r, z of points in the frame of coaxial set s, and the
+    # component of the line elements dl along its azimuth axis x rvec / r, over r
+    d = points - s["origin"]
+    z = d @ s["axis"]
+    rvec = d - z[..., None] * s["axis"]
+    r = np.linalg.norm(rvec, axis=-1)
+    if dl is None:
+        return r, z
+    with np.errstate(invalid="ignore", divide="ignore"):
+        g = np.where(r > 0, np.sum(np.cross(s["axis"], rvec) * dl, axis=-1) / r**2, 0.0)
+    return r, z, g
+
+
+def _orders(s, radius, position, normal, n):
+    # quadrature points for every pair of a loop of set s with one of the
+    # loops given, shape (len(s), len(radius)). n if given, else from their
+    # clearance, the 2d distance in (r, z) of the set's frame between the
+    # samples of the loop and the loop of the set. The minimum between two
+    # samples lies at most spacing^2 / (8 clearance) below the sampled one.
+    if n is not None:
+        return np.full((len(s["radius"]), len(radius)), n)
+    r, z = _in_set_frame(s, _loop_points(radius, position, normal, N_COARSE)[0])
+    clearance = np.empty((len(s["radius"]), len(radius)))
+    step = max(1, CHUNK // r.size)
+    for start in range(0, len(s["radius"]), step):
+        a = s["radius"][start:start + step, None, None]
+        zs = s["z"][start:start + step, None, None]
+        clearance[start:start + step] = np.hypot(r - a, z - zs).min(axis=-1)
+    spacing = 2 * np.pi * radius / N_COARSE
+    with np.errstate(divide="ignore", invalid="ignore"):
+        clearance -= spacing**2 / (8 * clearance)
+        wanted = np.where(clearance > 0, STEPS / np.arcsinh(clearance / radius), N_MAX)
+    return (2 ** np.ceil(np.log2(np.clip(wanted, N_MIN, N_MAX)))).astype(int)
+
+
+def _neumann(s, radius, position, normal, n):
+    # mutual inductances of the loops of coaxial set s with the loops given by
+    # radius, position and normal, shape (len(s), len(radius)). The pairs are
+    # grouped by their number of quadrature points and evaluated in chunks.
+    orders = _orders(s, radius, position, normal, n)
+    M = np.empty(orders.shape)
+    for order in np.unique(orders):
+        rows, columns = np.nonzero(orders == order)
+        loops, columns = np.unique(columns, return_inverse=True)
+        r, z, g = _in_set_frame(s, *_loop_points(radius[loops], position[loops], normal[loops], order))
+        step = max(1, CHUNK // order)
+        for start in range(0, len(rows), step):
+            i, j = rows[start:start + step], columns[start:start + step]
+            a = s["radius"][i, None]
+            zi = z[j] - s["z"][i, None]
+            _, kc = _moduli(a, r[j], zi)
+            # A_phi = mu0 / (2 pi) k sqrt(a/r) cel, written without the 1/sqrt(r)
+            A = MU0 / np.pi * a / np.sqrt((a + r[j]) ** 2 + zi**2) * _cel(kc, -1.0, 1.0)
+            M[i, loops[j]] = np.sum(A * r[j] * g[j], axis=-1)
+    return M
+
+
+def mutual_inductance(radius1, position1, normal1, radius2, position2, normal2, n=None):
+    """Mutual inductances [H] of every loop 1 with every loop 2, shape (n1, n2).
+
+    Neumann quadrature with n points on each loop 2, by default chosen per loop
+    from its clearance to the loops 1, for any relative position. The loops
+    must not intersect.
+    """
+    radius1 = np.atleast_1d(np.asarray(radius1, dtype=float))
+    radius2 = np.atleast_1d(np.asarray(radius2, dtype=float))
+    position2 = np.broadcast_to(np.asarray(position2, dtype=float), (len(radius2), 3))
+    normal2 = np.broadcast_to(_unit(np.reshape(normal2, (-1, 3))), (len(radius2), 3))
+
+    # the loops 1 are taken set by set, each in the frame of its axis
+    M = np.empty((len(radius1), len(radius2)))
+    for s in coaxial_sets(radius1, np.broadcast_to(position1, (len(radius1), 3)),
+                          np.broadcast_to(normal1, (len(radius1), 3)), 1.0):
+        M[s["index"]] = s["current"][:, None] * _neumann(s, radius2, position2, normal2, n)
+    return M
+
+
+def _coaxial_block(s, t, wire_radius):
+    # mutual inductances within one coaxial set, rows of s against t, with the
+    # self inductance of the turns on the diagonal (kc = 0 there, the closed
+    # form diverges and is evaluated at a dummy distance)
+    same = s["index"][:, None] == t["index"][None, :]
+    distance = np.where(same, 1.0, s["z"][:, None] - t["z"][None, :])
+    M = coaxial_mutual(s["radius"][:, None], t["radius"][None, :], distance)
+    if np.any(same):
+        M[same] = np.broadcast_to(self_inductance(s["radius"], wire_radius)[:, None], M.shape)[same]
+    return M
+
+
+def inductance_matrix(system, wire_radius=0.0005, n=None):
+    """Inductance matrix [H] of the coils of system, shape (n_coils, n_coils).
+
+    The diagonal holds the self inductance of every coil (all of its turns in
+    series), the rest the mutual inductances. wire_radius [m] enters the self
+    inductance of the single turns, n is the number of quadrature points per
+    loop for loops that are not coaxial, by default chosen from the clearance
+    between the loops.
+    """
+    sets = coaxial_sets(**system.loops())
+    # loop weights per coil for the reduction to coil level, (loops, coils)
+    weights = []
+    for s in sets:
+        w = np.zeros((len(s["index"]), system.n_coils))
+        w[np.arange(len(s["index"])), system.coil[s["index"]]] = s["current"]
+        weights.append(w)
+
+    L = np.zeros((system.n_coils, system.n_coils))
+    for i, s in enumerate(sets):
+        # closed form for the pairs within the set, in row chunks
+        step = max(1, CHUNK // len(s["index"]))
+        for start in range(0, len(s["index"]), step):
+            rows = {key: s[key][start:start + step] for key in ("index", "radius", "z")}
+            L += weights[i][start:start + step].T @ _coaxial_block(rows, s, wire_radius) @ weights[i]
+        # quadrature against the later sets, the matrix is symmetric
+        for j in range(i + 1, len(sets)):
+            t = sets[j]
+            # signs are in the weights, both sets use their own axis
+            neumann = _neumann(s, t["radius"], system.position[t["index"]],
+                               np.broadcast_to(t["axis"], (len(t["index"]), 3)), n)
+            block = weights[i].T @ neumann @ weights[j]
+            L += block + block.T
+    # symmetric up to the summation order of the reductions
+    return (L + L.T) / 2
+
+
+def group_inductance(system, wire_radius=0.0005, n=None):
+    """Inductance matrix [H] of the groups, the coils of a group in series."""
+    L = inductance_matrix(system, wire_radius, n)
+    groups = np.zeros((system.n_coils, system.n_groups))
+    groups[system.coil, system.group] = 1
+    return groups.T @ L @ groups
+
+
+def coupling(L):
+    """Coupling coefficients M_ij / sqrt(L_i L_j) of an inductance matrix."""
+    diagonal = np.sqrt(np.diag(L))
+    return L / np.outer(diagonal, diagonal)
+
+
+if __name__ == "__main__":
+    import time
+
+    from winding_pack import WindingPack
+
+    # inductances of the 3-axis Braunbek and timing of large winding packs,
+    # the accuracy checks are in tests/test_inductance.py
+    system = three_axis_braunbek((0.030/ORIG_D1, 0.035/ORIG_D1, 0.040/ORIG_D1))
+    L = group_inductance(system)
+    print("\n3d Braunbek axes [uH]\n", np.array2string(L * 1e6, precision=4, suppress_small=True))
+    print("coupling\n", np.array2string(coupling(L), precision=2, suppress_small=True))
+
+    # two packs of 16 full layers of 16 turns, coaxial and nested at right
+    # angles. The nested ones are mirror symmetric, so their M vanishes, with
+    # 21 mm between the closest turns.
+    inner = WindingPack(0.1, 256, 0.001, position=(0, 0, 0.05)).turns_system()
+    for name, other in (("coaxial", WindingPack(0.1, 256, 0.001, position=(0, 0, -0.05))),
+                        ("orthogonal", WindingPack(0.15, 256, 0.001, axis="x"))):
+        system = CoilSystem.concat(inner, other.turns_system())
+        t = time.perf_counter()
+        L = inductance_matrix(system, wire_radius=0.0005)
+        print(f"\n256 turn packs, {name}: {time.perf_counter() - t:.2f}s, "
+              f"L={L[0, 0]*1e3:.2f}mH, M={L[0, 1]*1e3:.3f}mH")
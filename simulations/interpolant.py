@@ -0,0 +1,130 @@
+import numpy as np
+
+# Lookup table interpolation of a fixed coil system.
+#
+# The field is sampled once on a regular grid that extends one cell past the
+# requested box on every side. Queries inside the box use tricubic
+# Catmull-Rom interpolation of the 4x4x4 surrounding samples, which is exact
+# for quadratic fields and continuous across cells. It is evaluated separably
+# in a few vectorized gathers, so a batch of points costs microseconds per
+# point instead of one cel iteration per loop and point.
+#
+# The interpolant has a getB method itself and can stand in for the system
+# wherever only the field inside the box is needed.
+
+
+def _catmull_rom(t):
+    # (n, 4) weights of the samples at -1, 0, 1, 2 for fractional positions t
+    t2 = t * t
+    t3 = t2 * t
+    return np.stack((
+        (-t3 + 2 * t2 - t) / 2,
+        (3 * t3 - 5 * t2 + 2) / 2,
+        (-3 * t3 + 4 * t2 + t) / 2,
+        (t3 - t2) / 2,
+    ), axis=-1)
+
+
+class FieldInterpolant:
+    """Tricubic interpolant of a field sampled on a regular grid.
+
+    lower, upper  corners of the box the interpolant answers queries in [m]
+    values        (nx+2, ny+2, nz+2, 3) samples from one spacing below lower
+                  to one spacing above upper
+    """
+
+    def __init__(self, lower, upper, values):
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.values = np.asarray(values)
+        self.shape = np.array(self.values.shape[:3]) - 2
+        self.spacing = (self.upper - self.lower) / (self.shape - 1)
+        # one flat array per component, gathering scalars is faster than rows
+        self._components = [np.ascontiguousarray(self.values[..., c]).ravel() for c in range(3)]
+        strides = np.array([self.values.shape[1] * self.values.shape[2], self.values.shape[2], 1])
+        self._strides = strides
+        # flat offsets of the 4x4x4 neighbourhood relative to its first sample
+        self._offsets = (np.stack(np.meshgrid(*(np.arange(4),) * 3, indexing="ij"), axis=-1)
+                         .reshape(-1, 3) @ strides)
+
+    @classmethod
+    def from_source(cls, source, lower, upper, shape, dtype=float):
+        """Sample source.getB (CoilSystem, magpylib object, ...) on a grid of shape points."""
+        lower = np.asarray(lower, dtype=float)
+        upper = np.asarray(upper, dtype=float)
+        shape = np.asarray(shape, dtype=int)
+        if np.any(shape < 2) or np.any(upper <= lower):
+            raise ValueError("The interpolation box needs at least 2 points and a positive extent per axis")
+        spacing = (upper - lower) / (shape - 1)
+        axes = [lo + h * np.arange(-1, n + 1) for lo, h, n in zip(lower, spacing, shape)]
+        grid = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1)
+        return cls(lower, upper, np.asarray(source.getB(grid), dtype=dtype))
+
+    def getB(self, points):
+        """Interpolated field [T] at points inside the box, shape (*points.shape[:-1], 3)."""
+        points = np.asarray(points, dtype=float)
+        flat = points.reshape(-1, 3)
+        u = (flat - self.lower) / self.spacing
+        # a little slack for points on the box faces after rounding
+        if np.any(u < -1e-9) or np.any(u > self.shape - 1 + 1e-9):
+            raise ValueError(f"Points outside of the interpolation box {self.lower} .. {self.upper}")
+
+        cell = np.clip(np.floor(u).astype(int), 0, self.shape - 2)
+        wx, wy, wz = (_catmull_rom(t) for t in (u - cell).T)
+        weights = (wx[:, :, None] * wy[:, None, :]).reshape(-1, 16)
+        weights = (weights[:, :, None] * wz[:, None, :]).reshape(-1, 64)
+
+        # the 4x4x4 samples start at cell - 1, which is index cell in the padded values
+        index = (cell @ self._strides)[:, None] + self._offsets
+        B = np.stack([np.einsum("nk,nk->n", weights, np.take(c, index))
+                      for c in self._components], axis=-1)
+        return B.reshape(*points.shape[:-1], 3)
+
+    __call__ = getB
+
+    def error_estimate(self, source, n=2000, seed=0):
+        """Deviation from source.getB on n random points in the box.
+
+        Returns a dict with the "max" and "rms" deviation [T] and both
+        relative to the largest field magnitude among the points.
+        """
+        rng = np.random.default_rng(seed)
+        points = self.lower + rng.random((n, 3)) * (self.upper - self.lower)
+        exact = source.getB(points)
+        error = np.linalg.norm(self.getB(points) - exact, axis=1)
+        norm = np.linalg.norm(exact, axis=1).max()
+        return dict(
+            max=error.max(),
+            rms=np.sqrt(np.mean(error**2)),
+            max_relative=error.max() / norm,
+            rms_relative=np.sqrt(np.mean(error**2)) / norm,
+        )
+
+    def save(self, path):
+        np.savez(path, lower=self.lower, upper=self.upper, values=self.values)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["lower"], data["upper"], data["values"])
+
+
+if __name__ == "__main__":
+    # Build an interpolant of the 3-axis Braunbek and time it against getB,
+    # the accuracy checks are in tests/test_interpolant.py
+    import time
+
+    from coilsystem import ORIG_D1, three_axis_braunbek
+
+    system = three_axis_braunbek((0.030/ORIG_D1, 0.035/ORIG_D1, 0.040/ORIG_D1))
+
+    t = time.perf_counter()
+    interpolant = FieldInterpolant.from_source(system, (-0.02,)*3, (0.02,)*3, (41, 41, 41))
+    print(f"build: {(time.perf_counter() - t)*1000:.1f}ms")
+
+    points = np.random.default_rng(1).uniform(-0.02, 0.02, (1000, 3))
+    for name, source in (("getB", system), ("interpolant", interpolant)):
+        t = time.perf_counter()
+        for _ in range(20):
+            source.getB(points)
+        print(f"{name}: {(time.perf_counter() - t)/20/len(points)*1e6:.2f}us per point")
@@ -0,0 +1,88 @@
+import numpy as np
+
+from coilsystem import ORIG_D1, three_axis_braunbek
+from field_basis import field_basis
+
+# Group currents for a commanded field vector.
+#
+# The field is linear in the group currents, at the points of a target region
+#   B(points) = A @ currents,   A of shape (3 * points, groups).
+# A uniform field b over the region is the target tile(b, points), which is
+# linear in b as well, so the least-squares currents
+#   currents = pinv(A) @ tile(b) = M @ b
+# reduce to one (groups, 3) matrix M computed once per geometry. Every request
+# afterwards is a single small matrix-vector product, which solve writes into
+# a caller provided array without allocating.
+
+
+class CurrentSolver:
+    """Group currents [A] giving a commanded field vector [T].
+
+    system   CoilSystem, every group is one independently driven circuit
+             with the winding currents it was built with per drive ampere
+    points   target region, default the centre only. With more points than
+             needed the currents are the least-squares fit of a uniform field
+             over all of them
+    rcond    cutoff for small singular values of the pseudo-inverse
+
+    For a tight control loop preallocate the output and pass float64 arrays,
+    then solve does not allocate:
+
+        out = np.empty(solver.n_groups)
+        solver.solve(b, out)
+    """
+
+    def __init__(self, system, points=(0, 0, 0), rcond=1e-10):
+        points = np.reshape(np.asarray(points, dtype=float), (-1, 3))
+        basis = field_basis(system, points)
+        A = basis.reshape(-1, system.n_groups)
+        pinv = np.linalg.pinv(A, rcond=rcond)
+        self.points = points
+        self.n_groups = system.n_groups
+        # pinv @ tile(b) summed over the points
+        self.matrix = np.ascontiguousarray(pinv.reshape(self.n_groups, len(points), 3).sum(axis=1))
+        self.forward = np.ascontiguousarray(basis.mean(axis=0))
+        # largest deviation from the commanded field in the region per T
+        # commanded, for each direction of b
+        fitted = A @ self.matrix
+        self.error = np.amax(np.abs(fitted - np.tile(np.eye(3), (len(points), 1)))
+                             .reshape(len(points), 3, 3), axis=(0, 1))
+
+    def __repr__(self):
+        return f"CurrentSolver({self.n_groups} groups, {len(self.points)} points)"
+
+    def solve(self, b, out=None):
+        """Currents for the field vector b, written into out if given."""
+        return np.dot(self.matrix, b, out=out)
+
+    __call__ = solve
+
+    def field(self, currents, out=None):
+        """Mean field over the target region for the given group currents."""
+        return np.dot(self.forward, currents, out=out)
+
+
+if __name__ == "__main__":
+    # The 3-axis set of 3d_braunbek.py, currents for a few commanded vectors
+    import time
+
+    system = three_axis_braunbek((0.030/ORIG_D1, 0.035/ORIG_D1, 0.040/ORIG_D1))
+    region = np.mgrid[-0.01:0.01:5j, -0.01:0.01:5j, -0.01:0.01:5j].T.reshape(-1, 3)
+    for name, points in (("centre", (0, 0, 0)), ("20mm cube", region)):
+        t = time.perf_counter()
+        solver = CurrentSolver(system, points)
+        setup = time.perf_counter() - t
+        print(f"{name}: setup {setup*1000:.1f}ms, worst deviation in region "
+              f"{np.amax(solver.error)*1e6:.1f}ppm of the commanded field")
+
+    b = np.array([10e-6, -5e-6, 20e-6])
+    currents = solver.solve(b)
+    print(f"B={b} T -> currents {currents} A, "
+          f"check {system.with_currents(currents).getB((0, 0, 0))}")
+
+    out = np.empty(solver.n_groups)
+    commands = np.random.default_rng(0).normal(0, 20e-6, (100000, 3))
+    t = time.perf_counter()
+    for command in commands:
+        solver.solve(command, out)
+    print(f"{(time.perf_counter() - t) / len(commands) * 1e6:.2f}us per request")
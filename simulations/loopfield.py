@@ -0,0 +1,307 @@
+import numpy as np
+
+# Vectorized field of circular current loops.
+#
+# A coil system is described by flat arrays instead of magpylib objects:
+#   radius   (n,)    loop radii [m]
+#   position (n, 3)  loop centres [m]
+#   normal   (n, 3)  loop axes, right-handed with respect to the current
+#   current  (n,)    loop currents [A]
+# and all loops are evaluated against all points in one broadcast.
+#
+# The loop field uses the numerically stable cel-expressions from
+# "Numerically stable and computationally efficient expression for the magnetic
+# field of a current loop.", M. Ortner et al., Magnetism 2023, 3(1), 11-31,
+# which is also what magpylib implements. Results agree with magpy.getB to
+# better than 1e-9 relative to the largest field value in the evaluated set
+# (the cel iteration stops at a relative change of 1e-8, which converges
+# quadratically well below that). Points on a wire return zero like magpylib.
+#
+# loop_jacobian gives the field gradient dB_i/dx_j analytically from the same
+# iteration, see circle_gradient_cyl, at about 1.6 times the cost of the field.
+
+MU0 = 1.25663706212e-6 # [T*m/A], CODATA 2018 value used by magpylib
+
+# loops x points pairs evaluated at once, bounds the temporary memory
+CHUNK = 1 << 20
+
+_CEL_ERRORTOL = 1e-8
+
+
+def _cel_iter(qc, p, cc, ss):
+    # iterative part of the Bulirsch cel algorithm with the first step already
+    # done, for several integrands cc[i], ss[i] that share kc and p (e.g. B_r
+    # and B_z of a loop), returned stacked as (len(cc), len(qc)). The
+    # integrands are kept as separate 1d arrays, which compact faster than
+    # one 2d array. Converged entries are dropped from the iteration as soon
+    # as they finish.
+    cc, ss = list(cc), list(ss)
+    out = np.empty((len(cc), len(qc)))
+    index = np.arange(len(qc))
+    g = np.ones_like(qc)
+    em = p
+    kk = qc
+    while True:
+        done = np.abs(g - qc) <= g * _CEL_ERRORTOL
+        if np.any(done):
+            norm = (np.pi / 2) / (em[done] * (em[done] + p[done]))
+            for i in range(len(cc)):
+                out[i, index[done]] = (ss[i][done] + cc[i][done] * em[done]) * norm
+            if np.all(done):
+                return out
+            keep = ~done
+            index, qc, p, em, kk = index[keep], qc[keep], p[keep], em[keep], kk[keep]
+            cc, ss = [x[keep] for x in cc], [x[keep] for x in ss]
+        qc = 2 * np.sqrt(kk)
+        kk = em * qc
+        g = kk / p
+        for i in range(len(cc)):
+            cc[i], ss[i] = cc[i] + ss[i] / p, 2 * (ss[i] + cc[i] * g)
+        p = p + g
+        g = em
+        em = em + qc
+
+
+def circle_field_cyl(radius, r, z, current):
+    """B_r and B_z [T] of loops in the z=0 plane centred at the origin.
+
+    All arguments broadcast against each other, r and z are the cylindrical
+    coordinates of the observers relative to each loop.
+    """
+    radius, r, z, current = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (radius, r, z, current)))
+    Br = np.zeros(r.shape)
+    Bz = np.zeros(r.shape)
+
+    # zero radius loops and observers on the wire carry no (finite) field
+    valid = (radius != 0) & ~((np.abs(r - radius) < 1e-15 * radius) & (z == 0))
+    if not np.any(valid):
+        return Br, Bz
+    a = np.abs(radius[valid])
+    r = r[valid] / a
+    z = z[valid] / a
+
+    z2 = z**2
+    x0 = z2 + (r + 1) ** 2
+    k2 = 4 * r / x0
+    q2 = (z2 + (r - 1) ** 2) / x0
+    q = np.sqrt(q2)
+    p = 1 + q
+    pf = MU0 * current[valid] / (4 * np.pi * a * np.sqrt(x0) * q2)
+
+    cc_r = k2 * 4 * z / x0
+    ss_r = 2 * cc_r * q / p
+    k4 = k2 * k2
+    cc_z = k4 - (q2 + 1) * (4 / x0)
+    ss_z = 2 * q * (k4 / p - (4 / x0) * p)
+    cel_r, cel_z = _cel_iter(q, p, (cc_r, cc_z), (ss_r, ss_z))
+
+    Br[valid] = pf * cel_r
+    Bz[valid] = -pf * cel_z
+    return Br, Bz
+
+
+def circle_gradient_cyl(radius, r, z, current):
+    """B_r / r, B_z and the derivatives dB_r/dr, dB_z/dr, dB_z/dz [T/m] of loops.
+
+    Arguments like circle_field_cyl. B_r / r stays finite on the axis, the
+    remaining derivative is dB_r/dz = dB_z/dr (the field is curl free).
+
+    In units of the loop radius, with s = 1 + r^2 + z^2, alpha^2 = s - 2r,
+    beta^2 = s + 2r and m = 4r / beta^2,
+      B_z = mu0 I / (2 pi) [(1 - r^2 - z^2) E(m) + alpha^2 K(m)] / (alpha^2 beta),
+    differentiated with dK/dm = D1 / (2 (1 - m)) and dE/dm = -D2 / 2, where
+    D1 = cel(kc, 1, 1, 0), D2 = cel(kc, 1, 0, 1), K = D1 + D2 and
+    E = D1 + kc^2 D2. Neither needs the difference of K and E, so there is no
+    cancellation near the axis. B_r / r comes from the cel form of B_r with
+    the factor r taken out, and dB_r/dr from div B = 0.
+    """
+    radius, r, z, current = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (radius, r, z, current)))
+    Br_r, Bz, dBz_dr, dBz_dz = (np.zeros(r.shape) for _ in range(4))
+
+    valid = (radius != 0) & ~((np.abs(r - radius) < 1e-15 * radius) & (z == 0))
+    if not np.any(valid):
+        return Br_r, Bz, -dBz_dz - Br_r, dBz_dr, dBz_dz
+    a = np.abs(radius[valid])
+    r = r[valid] / a
+    z = z[valid] / a
+
+    R2 = r**2 + z**2
+    alpha2 = 1 + R2 - 2 * r
+    beta2 = 1 + R2 + 2 * r
+    beta = np.sqrt(beta2)
+    q2 = alpha2 / beta2
+    q = np.sqrt(q2)
+    p = 1 + q
+
+    # D1, D2 and the B_r integrand of circle_field_cyl divided by r
+    cc_rr = 16 * z / beta2**2
+    one = np.ones_like(q)
+    cel = _cel_iter(q, p, (one, one, cc_rr), (2 * q, 2 * one, 2 * cc_rr * q / p))
+    D1, D2, cel_rr = cel
+    K = D1 + D2
+    E = D1 + q2 * D2
+    K_m = D1 / (2 * q2)
+    E_m = -D2 / 2
+
+    scale = MU0 * current[valid] / (2 * np.pi * a)
+    Br_r[valid] = MU0 * current[valid] / (4 * np.pi * a**2 * beta * q2) * cel_rr
+    N = (1 - R2) * E + alpha2 * K
+    Dn = alpha2 * beta
+    Bz[valid] = scale * N / Dn
+
+    m_r = 4 * (1 - r**2 + z**2) / beta2**2
+    m_z = -8 * r * z / beta2**2
+    N_r = -2 * r * E + (1 - R2) * E_m * m_r + (2 * r - 2) * K + alpha2 * K_m * m_r
+    N_z = -2 * z * E + (1 - R2) * E_m * m_z + 2 * z * K + alpha2 * K_m * m_z
+    # logarithmic derivatives of the denominator
+    L_r = (2 * r - 2) / alpha2 + (r + 1) / beta2
+    L_z = 2 * z / alpha2 + z / beta2
+    dBz_dr[valid] = scale / a * (N_r - N * L_r) / Dn
+    dBz_dz[valid] = scale / a * (N_z - N * L_z) / Dn
+    return Br_r, Bz, -dBz_dz - Br_r, dBz_dr, dBz_dz
+
+
+def _unit(v):
+    v = np.asarray(v, dtype=float)
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def _loop_chunk(radius, position, normal, current, points):
+    # (n, m, 3) field of every loop at every point
+    d = points[None, :, :] - position[:, None, :]
+    z = np.einsum("nmi,ni->nm", d, normal)
+    rvec = d - z[..., None] * normal[:, None, :]
+    r = np.linalg.norm(rvec, axis=-1)
+    Br, Bz = circle_field_cyl(radius[:, None], r, z, current[:, None])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(r > 0, Br / r, 0.0)
+    return scale[..., None] * rvec + Bz[..., None] * normal[:, None, :]
+
+
+def loop_fields(radius, position, normal, current, points):
+    """Field of each loop separately, shape (n_loops, *points.shape[:-1], 3)."""
+    radius = np.atleast_1d(np.asarray(radius, dtype=float))
+    position = np.reshape(np.asarray(position, dtype=float), (-1, 3))
+    normal = _unit(np.reshape(normal, (-1, 3)))
+    current = np.broadcast_to(np.asarray(current, dtype=float), radius.shape)
+    points = np.asarray(points, dtype=float)
+    flat = points.reshape(-1, 3)
+
+    B = np.empty((len(radius), len(flat), 3))
+    step = max(1, CHUNK // max(1, len(radius)))
+    for start in range(0, len(flat), step):
+        B[:, start:start + step] = _loop_chunk(
+            radius, position, normal, current, flat[start:start + step])
+    return B.reshape(len(radius), *points.shape[:-1], 3)
+
+
+def loop_field(radius, position, normal, current, points):
+    """Total field of all loops, shape (*points.shape[:-1], 3)."""
+    radius = np.atleast_1d(np.asarray(radius, dtype=float))
+    position = np.reshape(np.asarray(position, dtype=float), (-1, 3))
+    normal = _unit(np.reshape(normal, (-1, 3)))
+    current = np.broadcast_to(np.asarray(current, dtype=float), radius.shape)
+    points = np.asarray(points, dtype=float)
+    flat = points.reshape(-1, 3)
+
+    B = np.zeros((len(flat), 3))
+    step = max(1, CHUNK // max(1, len(radius)))
+    for start in range(0, len(flat), step):
+        B[start:start + step] = _loop_chunk(
+            radius, position, normal, current, flat[start:start + step]).sum(axis=0)
+    return B.reshape(*points.shape[:-1], 3)
+
+
+def _jacobian_chunk(radius, position, normal, current, points):
+    # (m, 3, 3) summed Jacobian dB_i/dx_j of all loops at the points
+    d = points[None, :, :] - position[:, None, :]
+    z = np.einsum("nmi,ni->nm", d, normal)
+    rvec = d - z[..., None] * normal[:, None, :]
+    r = np.linalg.norm(rvec, axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rhat = np.where(r[..., None] > 0, rvec / r[..., None], 0.0)
+    Br_r, _, dBr_dr, dBz_dr, dBz_dz = circle_gradient_cyl(radius[:, None], r, z, current[:, None])
+
+    # B = B_r rhat + B_z n, with d rhat / dx = (I - n n - rhat rhat) / r,
+    # summed over the loops term by term
+    rr = np.einsum("nm,nmi,nmj->mij", dBr_dr - Br_r, rhat, rhat, optimize=True)
+    rn = np.einsum("nm,nmi,nj->mij", dBz_dr, rhat, normal, optimize=True)
+    nn = np.einsum("nm,ni,nj->mij", dBz_dz - Br_r, normal, normal, optimize=True)
+    return rr + rn + np.swapaxes(rn, -1, -2) + nn + Br_r.sum(axis=0)[:, None, None] * np.eye(3)
+
+
+def loop_jacobian(radius, position, normal, current, points):
+    """Jacobian dB_i/dx_j [T/m] of all loops, shape (*points.shape[:-1], 3, 3).
+
+    Analytic, see circle_gradient_cyl. The matrix is symmetric and traceless
+    away from the wires.
+    """
+    radius = np.atleast_1d(np.asarray(radius, dtype=float))
+    position = np.reshape(np.asarray(position, dtype=float), (-1, 3))
+    normal = _unit(np.reshape(normal, (-1, 3)))
+    current = np.broadcast_to(np.asarray(current, dtype=float), radius.shape)
+    points = np.asarray(points, dtype=float)
+    flat = points.reshape(-1, 3)
+
+    J = np.zeros((len(flat), 3, 3))
+    step = max(1, CHUNK // max(1, len(radius)))
+    for start in range(0, len(flat), step):
+        J[start:start + step] = _jacobian_chunk(
+            radius, position, normal, current, flat[start:start + step])
+    return J.reshape(*points.shape[:-1], 3, 3)
+
+
+def loops_from_magpy(obj):
+    """Flat loop arrays of all magpy.current.Circle sources in obj.
+
+    obj can be a single Circle or a (nested) Collection. Sources with a path
+    are taken at their last path position.
+    """
+    import magpylib as magpy
+
+    sources = obj.sources_all if isinstance(obj, magpy.Collection) else [obj]
+    circles = [s for s in sources if isinstance(s, magpy.current.Circle)]
+    if len(circles) != len(sources):
+        raise TypeError("loops_from_magpy only supports magpy.current.Circle sources")
+
+    return dict(
+        radius=np.array([c.diameter / 2 for c in circles], dtype=float),
+        position=np.array([np.reshape(c.position, (-1, 3))[-1] for c in circles]),
+        normal=np.array([np.reshape(c.orientation.apply((0, 0, 1)), (-1, 3))[-1]
+                         for c in circles]),
+        current=np.array([c.current for c in circles], dtype=float),
+    )
+
+
+if __name__ == "__main__":
+    # Timing against magpylib on the helmholtz_example geometry, the accuracy
+    # checks are in tests/test_loopfield.py
+    import time
+    import magpylib as magpy
+
+    coil1 = magpy.Collection()
+    for z in np.linspace(-1, 1, 5):
+        for r in np.linspace(4, 5, 5):
+            coil1.add(magpy.current.Circle(current=10, diameter=2*r, position=(0,0,z)))
+    coil1.position = (0,0,5)
+    coil2 = coil1.copy(position=(0,0,-5))
+    coil2.rotate_from_angax(30, "x", anchor=0)
+    helmholtz = magpy.Collection(coil1, coil2)
+
+    grid = np.mgrid[-13:13:40j, -13:13:40j, -13:13:40j].T.reshape(-1, 3)
+
+    t = time.perf_counter()
+    magpy.getB(helmholtz, grid)
+    t_magpy = time.perf_counter() - t
+
+    t = time.perf_counter()
+    loop_field(**loops_from_magpy(helmholtz), points=grid)
+    t_loops = time.perf_counter() - t
+
+    print(f"magpy.getB: {t_magpy*1000:.1f}ms, loop_field: {t_loops*1000:.1f}ms")
+
+    t = time.perf_counter()
+    loop_jacobian(**loops_from_magpy(helmholtz), points=grid)
+    print(f"loop_jacobian: {(time.perf_counter() - t)*1000:.1f}ms")
@@ -0,0 +1,89 @@
+from math import factorial
+
+import numpy as np
+
+from loopfield import MU0
+
+# Closed-form B_z on the common axis of coaxial loops.
+#
+# A loop of radius a at axial position z0 carrying the current I has
+#   B_z(z) = MU0 I a^2 / 2 * (a^2 + (z - z0)^2)^(-3/2)
+# on its axis. With rho^2 = a^2 + z0^2 the generating function of the
+# Gegenbauer polynomials gives all derivatives at z = 0 in closed form:
+#   d^n/dz^n (a^2 + (z - z0)^2)^(-lam) = n! rho^(-2 lam - n) C_n^lam(z0 / rho)
+# These derivatives at the centre decide Helmholtz/Braunbek optimality.
+#
+# Loop parameters broadcast over leading axes, so many designs are evaluated
+# at once: radius, z0 and current have shape (..., n_loops).
+
+# samples x loops evaluated at once in axial_field
+CHUNK = 1 << 22
+
+
+def gegenbauer(order, lam, x):
+    """C_n^lam(x) for n = 0..order, shape (*x.shape, order+1)."""
+    x = np.asarray(x, dtype=float)
+    C = np.empty((*x.shape, order + 1))
+    C[..., 0] = 1
+    if order > 0:
+        C[..., 1] = 2 * lam * x
+    for n in range(2, order + 1):
+        C[..., n] = (2 * x * (n + lam - 1) * C[..., n - 1] - (n + 2 * lam - 2) * C[..., n - 2]) / n
+    return C
+
+
+def power_taylor(radius, z0, order, lam=1.5, center=0.0):
+    """Taylor coefficients of (a^2 + (z - z0)^2)^(-lam) around z = center.
+
+    Returns d^n/dz^n / n! for n = 0..order, shape (*radius.shape, order+1).
+    """
+    radius, z0 = np.broadcast_arrays(np.asarray(radius, dtype=float),
+                                     np.asarray(z0, dtype=float) - center)
+    rho = np.hypot(radius, z0)
+    n = np.arange(order + 1)
+    return gegenbauer(order, lam, z0 / rho) * rho[..., None] ** (-2 * lam - n)
+
+
+def axial_taylor(radius, z0, current, order, center=0.0):
+    """Taylor coefficients B_z^(n)(center) / n! [T/m^n] for n = 0..order.
+
+    Loop arrays have shape (..., n_loops), the result (..., order+1).
+    """
+    radius = np.asarray(radius, dtype=float)
+    scale = MU0 * np.asarray(current, dtype=float) * radius**2 / 2
+    return np.sum(scale[..., None] * power_taylor(radius, z0, order, 1.5, center), axis=-2)
+
+
+def axial_derivatives(radius, z0, current, order, center=0.0):
+    """Derivatives d^n B_z / dz^n at center [T/m^n] for n = 0..order."""
+    factorials = np.array([float(factorial(n)) for n in range(order + 1)])
+    return axial_taylor(radius, z0, current, order, center) * factorials
+
+
+def axial_field(radius, z0, current, z):
+    """B_z [T] at the axial positions z, shape (..., len(z)) for loops (..., n_loops)."""
+    radius, z0, current = np.broadcast_arrays(*(np.asarray(a, dtype=float)
+                                                for a in (radius, z0, current)))
+    z = np.asarray(z, dtype=float)
+    scale = (MU0 * current * radius**2 / 2)[..., None]
+    a2 = (radius**2)[..., None]
+    z0 = z0[..., None]
+
+    B = np.empty((*radius.shape[:-1], len(z)))
+    step = max(1, CHUNK // max(1, radius.size))
+    for start in range(0, len(z), step):
+        u = z[start:start + step] - z0
+        w = a2 + u * u
+        B[..., start:start + step] = np.sum(scale / (w * np.sqrt(w)), axis=-2)
+    return B
+
+
+def coaxial_loops(system, atol=1e-12):
+    """radius, z0 and current of a CoilSystem whose windings share the z-axis.
+
+    Windings with their normal along -z get a negated current.
+    """
+    if (np.any(np.abs(system.position[:, :2]) > atol)
+            or np.any(np.abs(system.normal[:, :2]) > atol)):
+        raise ValueError("All windings have to be centred on and normal to the z-axis")
+    return system.radius, system.position[:, 2], system.current * np.sign(system.normal[:, 2])
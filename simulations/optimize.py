@@ -0,0 +1,148 @@
+import numpy as np
+from scipy.optimize import minimize
+
+from coilsystem import ORIG_D1, ORIG_D2, ORIG_R1, ORIG_R2, braunbek_from_dims
+from loopfield import MU0
+from onaxis import power_taylor
+
+# Re-optimisation of the four-coil Braunbek geometry under mechanical
+# constraints.
+#
+# The objective is the sum of squares of the normalised axial Taylor
+# coefficients c_n = B_z^(n)(0) / n! * rho^n / B_z(0) for the chosen even
+# orders, where rho is the radius of the target volume. Driving these to
+# zero nulls the low-order axial derivatives; weighting with rho^n makes the
+# objective the leading deviation over the target sphere, so minimising it
+# maximises the region that stays homogeneous around that size.
+#
+# Gradients are analytic: for T_n^lam, the Taylor coefficients of
+# (a^2 + (z - z0)^2)^(-lam),
+#   dT_n^lam / dz0 = -(n + 1) T_(n+1)^lam
+#   dT_n^lam / da  = -2 lam a T_n^(lam+1)
+
+PARAMS = ("inner_diameter", "outer_diameter", "inner_distance", "outer_distance")
+
+# Loops of braunbek_from_dims: +outer, +inner, -inner, -outer.
+# Radius and axial position of each loop as linear functions of the parameters.
+_RADIUS = np.array([
+    [0, 0.5, 0, 0],
+    [0.5, 0, 0, 0],
+    [0.5, 0, 0, 0],
+    [0, 0.5, 0, 0],
+])
+_POSITION = np.array([
+    [0, 0, 0, 1],
+    [0, 0, 1, 0],
+    [0, 0, -1, 0],
+    [0, 0, 0, -1],
+])
+
+
+def braunbek_taylor(params, order, current=1):
+    """Axial Taylor coefficients of a Braunbek and their parameter gradients.
+
+    params holds the values for PARAMS [m]. Returns the coefficients
+    B_z^(n)(0) / n! for n = 0..order and their derivatives with respect to
+    the parameters, shape (order+1, 4).
+    """
+    params = np.asarray(params, dtype=float)
+    a = _RADIUS @ params
+    z0 = _POSITION @ params
+    scale = MU0 * current / 2
+
+    T3 = power_taylor(a, z0, order + 1, 1.5) # (loops, order+2)
+    T5 = power_taylor(a, z0, order, 2.5)
+    n = np.arange(order + 1)
+
+    coefficients = scale * np.sum(a[:, None] ** 2 * T3[:, :-1], axis=0)
+    d_a = scale * (2 * a[:, None] * T3[:, :-1] - 3 * a[:, None] ** 3 * T5)
+    d_z0 = scale * a[:, None] ** 2 * -(n + 1) * T3[:, 1:]
+    gradient = d_a.T @ _RADIUS + d_z0.T @ _POSITION
+    return coefficients, gradient
+
+
+def _objective(params, orders, target_radius):
+    coefficients, gradient = braunbek_taylor(params, max(orders))
+    b0, db0 = coefficients[0], gradient[0]
+    weights = target_radius ** np.asarray(orders, dtype=float)
+    c = weights * coefficients[orders] / b0
+    dc = weights[:, None] * (gradient[orders] * b0 - coefficients[orders, None] * db0) / b0**2
+    return np.sum(c**2), 2 * c @ dc
+
+
+def optimize_braunbek(fixed=None, initial=None, max_diameter=None, min_gap=0.0,
+                      orders=(2, 4, 6), target_radius=None):
+    """Braunbek dimensions [m] minimising the axial deviation coefficients.
+
+    fixed         dict of PARAMS held constant, e.g. {"inner_distance": 0.030}
+    initial       dict of starting values, by default the GFZ design scaled to
+                  the fixed inner distance
+    max_diameter  upper limit for both coil diameters
+    min_gap       minimum axial gap between inner and outer coils
+    orders        even orders of the Taylor coefficients to null
+    target_radius radius of the volume to optimise for, default half the
+                  inner distance
+
+    Returns a dict with the optimised "params", the normalised "coefficients"
+    c_n, the "system" as a CoilSystem and the scipy "result".
+    """
+    fixed = dict(fixed or {})
+    unknown = set(fixed).difference(PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown parameters {sorted(unknown)}, expected some of {PARAMS}")
+
+    scale = fixed.get("inner_distance", ORIG_D1) / ORIG_D1
+    start = dict(zip(PARAMS, np.array([ORIG_R1, ORIG_R2, ORIG_D1, ORIG_D2]) * scale))
+    start.update(initial or {})
+    start.update(fixed)
+    if max_diameter is not None:
+        for name in ("inner_diameter", "outer_diameter"):
+            if name not in fixed:
+                start[name] = min(start[name], max_diameter)
+
+    orders = list(orders)
+    if target_radius is None:
+        target_radius = start["inner_distance"] / 2
+
+    # optimise the free parameters in units of the inner distance
+    length = start["inner_distance"]
+    free = [i for i, name in enumerate(PARAMS) if name not in fixed]
+    values = np.array([start[name] for name in PARAMS])
+
+    def expand(x):
+        p = values.copy()
+        p[free] = x * length
+        return p
+
+    def fun(x):
+        J, dJ = _objective(expand(x), orders, target_radius)
+        return J, dJ[free] * length
+
+    bounds = []
+    for i in free:
+        upper = max_diameter if (max_diameter is not None and PARAMS[i].endswith("diameter")) else None
+        bounds.append((1e-6, None if upper is None else upper / length))
+
+    # outer coils stay outside the inner ones
+    gap = np.zeros(len(PARAMS))
+    gap[PARAMS.index("outer_distance")] = 1
+    gap[PARAMS.index("inner_distance")] = -1
+    constraints = [dict(
+        type="ineq",
+        fun=lambda x: gap @ expand(x) / length - min_gap / length,
+        jac=lambda x: gap[free],
+    )]
+
+    result = minimize(fun, values[free] / length, jac=True, method="SLSQP",
+                      bounds=bounds, constraints=constraints,
+                      options=dict(ftol=1e-20, maxiter=500))
+
+    params = dict(zip(PARAMS, expand(result.x)))
+    coefficients, _ = braunbek_taylor(expand(result.x), max(orders))
+    normalised = {n: coefficients[n] * target_radius**n / coefficients[0] for n in orders}
+    return dict(
+        params=params,
+        coefficients=normalised,
+        system=braunbek_from_dims(**params),
+        result=result,
+    )
@@ -0,0 +1,163 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Named timing spans for simulation runs.
+#
+#   with span("frames"):
+#       ...
+#
+# Profiling is off unless COILS_PROFILE is set or enable() is called, which
+# run.py and benchmark.py do for --profile. Disabled spans then return one
+# shared no-op context and cost a function call. When on, every span records
+# its wall time and the peak traced memory above its start, nested spans
+# included. At exit a summary table per span name is printed and
+# a Chrome trace written, which chrome://tracing, Perfetto and speedscope can
+# open. COILS_PROFILE=path.json chooses the trace file, any other value
+# writes TRACE.
+
+ENV = "COILS_PROFILE"
+TRACE = "profile_trace.json"
+
+_enabled = False
+_trace_path = TRACE
+_events = []
+_stack = []
+_origin = time.perf_counter()
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        current, peak = tracemalloc.get_traced_memory()
+        # fold the peak so far into the enclosing span before resetting it
+        if _stack:
+            _stack[-1].peak = max(_stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        self.memory = current
+        self.peak = current
+        self.start = time.perf_counter()
+        _stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        _stack.pop()
+        _, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        tracemalloc.reset_peak()
+        if _stack:
+            _stack[-1].peak = max(_stack[-1].peak, self.peak)
+        _events.append(dict(
+            name=self.name,
+            start=self.start - _origin,
+            duration=end - self.start,
+            memory=self.peak - self.memory,
+            depth=len(_stack),
+        ))
+        return False
+
+
+def span(name):
+    """Context manager timing the enclosed block under name."""
+    return _Span(name) if _enabled else _NO_SPAN
+
+
+def profiled(name=None):
+    """Decorator wrapping every call of a function in a span."""
+    def decorate(function):
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return function(*args, **kwargs)
+
+        return wrapper
+    return decorate
+
+
+def enable(trace_path=TRACE):
+    """Switch profiling on for the rest of the run."""
+    global _enabled, _trace_path
+    if _enabled:
+        return
+    _enabled = True
+    _trace_path = trace_path
+    tracemalloc.start()
+    atexit.register(report)
+
+
+def enabled():
+    return _enabled
+
+
+def summary():
+    """Per span name: calls, total and max time [s] and peak memory [bytes]."""
+    rows = {}
+    for event in _events:
+        row = rows.setdefault(event["name"], dict(calls=0, total=0.0, max=0.0, memory=0))
+        row["calls"] += 1
+        row["total"] += event["duration"]
+        row["max"] = max(row["max"], event["duration"])
+        row["memory"] = max(row["memory"], event["memory"])
+    return rows
+
+
+def print_summary():
+    rows = summary()
+    if not rows:
+        return
+    width = max(len(name) for name in rows)
+    print()
+    print(f"{'span':>{width}} {'calls':>7} {'total':>10} {'mean':>10} {'max':>10} {'peak memory':>12}")
+    for name, row in sorted(rows.items(), key=lambda item: -item[1]["total"]):
+        print(f"{name:>{width}} {row['calls']:>7d} {row['total']:>9.3f}s "
+              f"{row['total'] / row['calls']:>9.4f}s {row['max']:>9.4f}s "
+              f"{row['memory'] / 2**20:>10.1f}MB")
+
+
+def write_trace(path):
+    """Chrome trace event file of all spans."""
+    pid = os.getpid()
+    tid = threading.get_ident()
+    events = [dict(
+        name=event["name"],
+        ph="X",
+        ts=event["start"] * 1e6,
+        dur=event["duration"] * 1e6,
+        pid=pid,
+        tid=tid,
+        args=dict(peak_memory_bytes=event["memory"]),
+    ) for event in _events]
+    with open(path, "w") as file:
+        json.dump(dict(traceEvents=events, displayTimeUnit="ms"), file)
+
+
+def report():
+    print_summary()
+    if _events:
+        write_trace(_trace_path)
+        print(f"Trace written to {_trace_path}")
+
+
+_setting = os.environ.get(ENV, "")
+if _setting and _setting != "0":
+    enable(_setting if _setting.endswith(".json") else TRACE)
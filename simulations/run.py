@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import profiling
+from coilsystem import CoilSystem, braunbek, braunbek_from_dims, helmholtz, three_axis_braunbek
+from winding_pack import pack_pair
+
+# Headless runner for config driven scenarios.
+#
+#   python run.py scenarios/3d_braunbek.toml -o results/
+#
+# A scenario (TOML or JSON) describes the coil system as a list of parts and
+# the outputs to produce from it:
+#
+#   [[system]]
+#   type = "braunbek"        # any of BUILDERS, the other keys are its arguments
+#   scale = 0.2778
+#   rotate = {angle = 90, axis = "x"}   # optional, also move = [x, y, z]
+#
+#   [[output]]
+#   type = "homogeneity"     # any of OUTPUTS
+#   ppm = [10, 100]
+#
+# Numbers go to results.json in the output directory, arrays and figures to
+# the files named in the outputs. Plotting packages are only imported by the
+# outputs that draw something, matplotlib with the non-interactive Agg
+# backend, so nothing blocks and numeric runs start in a fraction of a second.
+
+BUILDERS = {
+    "braunbek": braunbek,
+    "braunbek_from_dims": braunbek_from_dims,
+    "helmholtz": helmholtz,
+    "three_axis_braunbek": three_axis_braunbek,
+    "pack_pair": pack_pair,
+}
+
+
+def load_config(path):
+    if path.endswith(".toml"):
+        import tomllib
+
+        with open(path, "rb") as file:
+            return tomllib.load(file)
+    with open(path) as file:
+        return json.load(file)
+
+
+def build_system(parts):
+    """CoilSystem from the [[system]] parts of a scenario, one after the other."""
+    systems = []
+    for part in parts:
+        part = dict(part)
+        kind = part.pop("type")
+        if kind not in BUILDERS:
+            raise ValueError(f"Unknown system type {kind!r}, expected one of {sorted(BUILDERS)}")
+        rotate = part.pop("rotate", None)
+        move = part.pop("move", None)
+        system = BUILDERS[kind](**part)
+        if rotate is not None:
+            system = system.rotated(**rotate)
+        if move is not None:
+            system = system.moved(move)
+        systems.append(system)
+    return CoilSystem.concat(*systems)
+
+
+def _grid(spec):
+    # regular grid between lower and upper, axes with lower == upper are fixed
+    lower, upper = spec["lower"], spec["upper"]
+    shape = spec.get("shape") or [spec.get("n", 40) if hi > lo else 1 for lo, hi in zip(lower, upper)]
+    axes = [np.linspace(lo, hi, n) for lo, hi, n in zip(lower, upper, shape)]
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1)
+
+
+def _path(spec, directory, default):
+    return os.path.join(directory, spec.get("file", default))
+
+
+def center_field(system, spec, directory):
+    return dict(B=system.getB(spec.get("center", (0, 0, 0))).tolist())
+
+
+def field(system, spec, directory):
+    points = _grid(spec)
+    B = system.getB(points)
+    path = _path(spec, directory, "field.npz")
+    np.savez_compressed(path, points=points, B=B)
+    return dict(file=path, points=int(np.prod(points.shape[:-1])))
+
+
+def volume_map(system, spec, directory):
+    from volume_map import write_volume_map
+
+    path = _path(spec, directory, "volume_map.npy")
+    volume = write_volume_map(system, path, spec["lower"], spec["upper"], spec["shape"],
+                              chunk=spec.get("chunk", 1 << 18))
+    return dict(file=path, shape=list(volume.shape), complete=volume.complete)
+
+
+def homogeneity(system, spec, directory):
+    from homogeneity import homogeneous_region
+
+    center = spec.get("center", (0, 0, 0))
+    regions = {}
+    for ppm in spec.get("ppm", (10, 100, 1000)):
+        region = homogeneous_region(system, ppm, center, spec.get("r_max"))
+        regions[f"{ppm}ppm"] = dict(radius=float(region["radius"]), volume=float(region["volume"]))
+    return regions
+
+
+def axial_taylor(system, spec, directory):
+    from onaxis import axial_taylor as taylor, coaxial_loops
+
+    coefficients = taylor(*coaxial_loops(system), spec.get("order", 8), spec.get("center", 0.0))
+    return dict(coefficients=coefficients.tolist())
+
+
+def field_lines(system, spec, directory):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    from fieldlines import line_collection, plane_field_lines
+
+    lower, upper = np.asarray(spec["lower"], dtype=float), np.asarray(spec["upper"], dtype=float)
+    axes = tuple(np.flatnonzero(upper > lower))
+    lines, norms = plane_field_lines(system, lower, upper, density=spec.get("density", 2))
+
+    fig, ax = plt.subplots(1, 1, figsize=(6, 5))
+    if lines:
+        Bmax = max(np.amax(norm) for norm in norms)
+        lc = line_collection(lines, [norm / Bmax for norm in norms], axes=axes, cmap="coolwarm",
+                             linewidth=spec.get("linewidth", 0.8))
+        ax.add_collection(lc)
+        fig.colorbar(lc, ax=ax, label="|B| / max |B|")
+    labels = "xyz"
+    ax.set(
+        title=spec.get("title", "Magnetic field"),
+        xlabel=f"{labels[axes[0]]}-position (m)",
+        ylabel=f"{labels[axes[1]]}-position (m)",
+        xlim=(lower[axes[0]], upper[axes[0]]),
+        ylim=(lower[axes[1]], upper[axes[1]]),
+        aspect=1,
+    )
+    path = _path(spec, directory, "field_lines.png")
+    fig.savefig(path, dpi=spec.get("dpi", 150))
+    plt.close(fig)
+    return dict(file=path, lines=len(lines))
+
+
+def coils(system, spec, directory):
+    import magpylib as magpy
+
+    fig = magpy.show(system.to_magpy(spec.get("colors")), backend="plotly", return_fig=True)
+    path = _path(spec, directory, "coils.html")
+    fig.write_html(path, include_plotlyjs=spec.get("include_plotlyjs", "cdn"))
+    return dict(file=path)
+
+
+OUTPUTS = {
+    "center_field": center_field,
+    "field": field,
+    "volume_map": volume_map,
+    "homogeneity": homogeneity,
+    "axial_taylor": axial_taylor,
+    "field_lines": field_lines,
+    "coils": coils,
+}
+
+
+def run(config, directory, only=None):
+    """Build the scenario and produce its outputs, returns the results dict."""
+    os.makedirs(directory, exist_ok=True)
+    t = time.perf_counter()
+    system = build_system(config["system"])
+    results = dict(name=config.get("name", ""), system=repr(system), outputs=[])
+    print(f"{results['name'] or 'scenario'}: {system!r}")
+
+    for spec in config.get("output", ()):
+        kind = spec["type"]
+        if only and kind not in only:
+            continue
+        if kind not in OUTPUTS:
+            raise ValueError(f"Unknown output type {kind!r}, expected one of {sorted(OUTPUTS)}")
+        start = time.perf_counter()
+        result = OUTPUTS[kind](system, spec, directory)
+        seconds = time.perf_counter() - start
+        results["outputs"].append(dict(type=kind, seconds=seconds, **result))
+        print(f"  {kind}: {seconds:.3f}s {json.dumps(result)}")
+
+    results["seconds"] = time.perf_counter() - t
+    with open(os.path.join(directory, "results.json"), "w") as file:
+        json.dump(results, file, indent=2)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a coil scenario headless")
+    parser.add_argument("config", help="scenario file, .toml or .json")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="directory for results and files, default output/<scenario name>")
+    parser.add_argument("--only", nargs="*", help="only produce these output types")
+    parser.add_argument("--profile", action="store_true",
+                        help="time the phases and write a trace, see profiling.py")
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiling.enable()
+
+    config = load_config(args.config)
+    name = config.get("name") or os.path.splitext(os.path.basename(args.config))[0]
+    config.setdefault("name", name)
+    run(config, args.output_dir or os.path.join("output", name), args.only)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import csv
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice, product
+
+import numpy as np
+
+from coilsystem import braunbek
+from homogeneity import peak_deviation
+
+# Design sweeps spread parameter points over a process pool and stream one
+# CSV row per point to disk as soon as its batch finishes. Parameter points
+# are generated lazily and only a bounded number of batches is in flight, so
+# memory does not grow with the size of the sweep.
+
+
+def parameter_grid(**axes):
+    """Lazy cartesian product of the given parameter axes as dicts."""
+    names = list(axes)
+    for values in product(*axes.values()):
+        yield dict(zip(names, values))
+
+
+def _evaluate_batch(evaluate, batch):
+    return [{**params, **evaluate(**params)} for params in batch]
+
+
+def _batches(params, size):
+    params = iter(params)
+    while batch := list(islice(params, size)):
+        yield batch
+
+
+def run_sweep(evaluate, params, path, workers=None, batch_size=64):
+    """Evaluate evaluate(**p) for every p in params and write rows to path.
+
+    evaluate has to be a module level function (it is sent to the worker
+    processes) returning a dict of metrics. Rows hold the parameters followed
+    by the metrics, in completion order. Returns the number of rows written.
+    """
+    workers = workers or os.cpu_count()
+    batches = _batches(params, batch_size)
+    rows = 0
+    with open(path, "w", newline="") as file, ProcessPoolExecutor(workers) as pool:
+        writer = None
+        pending = set()
+        while True:
+            # keep every worker busy with a small queue, but never more
+            for batch in islice(batches, 2 * workers - len(pending)):
+                pending.add(pool.submit(_evaluate_batch, evaluate, batch))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results = future.result()
+                if writer is None:
+                    writer = csv.DictWriter(file, fieldnames=list(results[0]))
+                    writer.writeheader()
+                writer.writerows(results)
+                rows += len(results)
+            file.flush()
+    return rows
+
+
+def braunbek_metrics(scale, position_factor, current=1, radius=0.01):
+    """Centre field and peak deviation within radius [m] of a scaled Braunbek
+    with the outer coils moved by position_factor."""
+    system = braunbek(scale, current)
+    outer = np.isin(system.coil, (0, 3))
+    system.position[outer] *= position_factor
+
+    B0 = system.getB((0, 0, 0))
+    return dict(Bz=B0[2], max_deviation_ppm=peak_deviation(system, radius) * 1e6)
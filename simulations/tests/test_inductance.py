@@ -0,0 +1,65 @@
+import numpy as np
+
+from coilsystem import ORIG_D1, CoilSystem, three_axis_braunbek
+from inductance import (MU0, _loop_points, coaxial_mutual, group_inductance, inductance_matrix,
+                        mutual_inductance)
+from loopfield import _unit
+from winding_pack import WindingPack
+
+
+def double_sum(a, position1, normal1, b, position2, normal2, n=2000):
+    # Neumann's formula summed over both loops, independent of cel
+    points1, dl1 = _loop_points(np.array([a]), np.array([position1], dtype=float),
+                                _unit(np.array([normal1], dtype=float)), n)
+    points2, dl2 = _loop_points(np.array([b]), np.array([position2], dtype=float),
+                                _unit(np.array([normal2], dtype=float)), n)
+    distance = np.linalg.norm(points1[0, :, None] - points2[0, None], axis=-1)
+    return MU0 / (4 * np.pi) * np.sum((dl1[0] @ dl2[0].T) / distance)
+
+
+def test_tilted_loops_against_the_double_sum():
+    for position, normal in (((0.03, 0.02, 0.05), (0.3, 0.2, 1)),
+                             ((0.0, 0.12, 0.01), (0, 1, 0.2)),
+                             ((0.2, 0.0, 0.0), (1, 0, 0))):
+        reference = double_sum(0.1, (0, 0, 0), (0, 0, 1), 0.08, position, normal)
+        M = mutual_inductance(0.1, (0, 0, 0), (0, 0, 1), 0.08, position, normal)[0, 0]
+        assert abs(M - reference) < 1e-9 * MU0 * 0.1
+
+
+def test_close_tilted_loops_converge():
+    # 0.5 mm clearance, the quadrature points follow it
+    b, z, gap = 0.15, 0.0655, 0.0005
+    args = (np.sqrt((b - gap) ** 2 - z**2), (0, 0, z), (0, 0, 1), b, (0.003, 0, 0), (1, 0, 0))
+    reference = mutual_inductance(*args, n=1 << 15)[0, 0]
+    assert abs(mutual_inductance(*args)[0, 0] - reference) < 1e-5 * abs(reference)
+
+
+def test_coaxial_closed_form():
+    # against the quadrature and the close loop asymptote mu0 a (ln(8a/d) - 2)
+    quadrature = mutual_inductance(0.1, (0, 0, 0), (0, 0, 1), 0.08, (0, 0, 0.05), (0, 0, 1), n=64)
+    assert np.isclose(coaxial_mutual(0.1, 0.08, 0.05), quadrature[0, 0], rtol=1e-12)
+    assert np.isclose(coaxial_mutual(0.1, 0.1, 1e-4), MU0 * 0.1 * (np.log(8e3) - 2), rtol=1e-6)
+
+
+def test_orthogonal_packs_do_not_couple():
+    # full layers, mirror symmetric, so M vanishes
+    inner = WindingPack(0.1, 64, 0.001, position=(0, 0, 0.005)).turns_system()
+    outer = WindingPack(0.13, 64, 0.001, axis="x").turns_system()
+    L = inductance_matrix(CoilSystem.concat(inner, outer))
+    assert abs(L[0, 1]) < 1e-12 * L[0, 0]
+
+
+def test_matrix_matches_the_pair_sums():
+    a = WindingPack(0.05, 9, 0.001, position=(0, 0, 0.02)).turns_system()
+    b = WindingPack(0.04, 9, 0.001, position=(0.01, 0, -0.03), axis=(0.2, 0, 1)).turns_system()
+    L = inductance_matrix(CoilSystem.concat(a, b))
+    M = mutual_inductance(a.radius, a.position, a.normal, b.radius, b.position, b.normal)
+    assert np.isclose(L[0, 1], M.sum(), rtol=1e-10)
+    assert np.allclose(L, L.T, rtol=0, atol=1e-15)
+
+
+def test_three_axis_braunbek_axes_are_decoupled():
+    system = three_axis_braunbek((0.030 / ORIG_D1, 0.035 / ORIG_D1, 0.040 / ORIG_D1))
+    L = group_inductance(system)
+    assert np.all(np.diag(L) > 0)
+    assert np.amax(np.abs(L - np.diag(np.diag(L)))) < 1e-12 * np.amax(L)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from coilsystem import ORIG_D1, three_axis_braunbek
+from interpolant import FieldInterpolant
+
+
+class Quadratic:
+    # a field quadratic in the coordinates, which Catmull-Rom reproduces exactly
+    def getB(self, points):
+        x, y, z = np.moveaxis(np.asarray(points), -1, 0)
+        return np.stack((1 + x * y, z**2 - 2 * x, 3 * y * z + x**2), axis=-1)
+
+
+def test_quadratic_field_is_exact():
+    interpolant = FieldInterpolant.from_source(Quadratic(), (-1, -2, 0), (1, 0, 3), (5, 6, 7))
+    points = np.random.default_rng(0).uniform((-1, -2, 0), (1, 0, 3), (200, 3))
+    np.testing.assert_allclose(interpolant.getB(points), Quadratic().getB(points), atol=1e-12)
+
+
+def test_three_axis_braunbek_accuracy():
+    system = three_axis_braunbek((0.030 / ORIG_D1, 0.035 / ORIG_D1, 0.040 / ORIG_D1))
+    interpolant = FieldInterpolant.from_source(system, (-0.02,) * 3, (0.02,) * 3, (21, 21, 21))
+    assert interpolant.error_estimate(system, n=500)["max_relative"] < 1e-6
+
+
+def test_points_outside_raise():
+    interpolant = FieldInterpolant.from_source(Quadratic(), (0, 0, 0), (1, 1, 1), (3, 3, 3))
+    with pytest.raises(ValueError):
+        interpolant.getB([(0.5, 0.5, 1.1)])
+
+
+def test_save_and_load(tmp_path):
+    interpolant = FieldInterpolant.from_source(Quadratic(), (0, 0, 0), (1, 1, 1), (3, 4, 5))
+    interpolant.save(tmp_path / "field.npz")
+    loaded = FieldInterpolant.load(tmp_path / "field.npz")
+    points = np.random.default_rng(1).random((20, 3))
+    np.testing.assert_array_equal(loaded.getB(points), interpolant.getB(points))
@@ -0,0 +1,50 @@
+import magpylib as magpy
+import numpy as np
+
+from loopfield import loop_field, loop_fields, loop_jacobian, loops_from_magpy
+
+
+def tilted_pair():
+    # the helmholtz_example geometry, the second coil tilted by 30 degrees
+    coil1 = magpy.Collection()
+    for z in np.linspace(-1, 1, 3):
+        for r in np.linspace(4, 5, 3):
+            coil1.add(magpy.current.Circle(current=10, diameter=2 * r, position=(0, 0, z)))
+    coil1.position = (0, 0, 5)
+    coil2 = coil1.copy(position=(0, 0, -5))
+    coil2.rotate_from_angax(30, "x", anchor=0)
+    return magpy.Collection(coil1, coil2)
+
+
+def test_loop_field_matches_magpy():
+    collection = tilted_pair()
+    grid = np.mgrid[-13:13:15j, -13:13:15j, -13:13:15j].T.reshape(-1, 3)
+    expected = magpy.getB(collection, grid)
+    B = loop_field(**loops_from_magpy(collection), points=grid)
+    assert np.amax(np.abs(B - expected)) < 1e-9 * np.amax(np.abs(expected))
+
+
+def test_loop_fields_sum_to_loop_field():
+    loops = loops_from_magpy(tilted_pair())
+    points = np.random.default_rng(0).uniform(-8, 8, (50, 3))
+    separate = loop_fields(**loops, points=points)
+    assert separate.shape == (len(loops["radius"]), 50, 3)
+    np.testing.assert_allclose(separate.sum(axis=0), loop_field(**loops, points=points),
+                               rtol=0, atol=1e-12 * np.amax(np.abs(separate)))
+
+
+def test_points_on_the_wire_are_zero():
+    B = loop_field(radius=1.0, position=(0, 0, 0), normal=(0, 0, 1), current=1.0,
+                   points=[(1, 0, 0), (0, -1, 0)])
+    assert np.all(B == 0)
+
+
+def test_jacobian_matches_central_differences():
+    loops = loops_from_magpy(tilted_pair())
+    points = np.random.default_rng(1).uniform(-8, 8, (200, 3))
+    h = 1e-6
+    expected = np.stack([(loop_field(**loops, points=points + h * e)
+                          - loop_field(**loops, points=points - h * e)) / (2 * h)
+                         for e in np.eye(3)], axis=-1)
+    J = loop_jacobian(**loops, points=points)
+    assert np.amax(np.abs(J - expected)) < 1e-6 * np.amax(np.abs(expected))
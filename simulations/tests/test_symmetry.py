@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from coilsystem import ORIG_D1, CoilSystem, braunbek, helmholtz, three_axis_braunbek
+from loopfield import loop_field
+from symmetry import coaxial_sets, symmetric_field
+
+
+def systems():
+    pair = helmholtz(0.100)
+    tilted = braunbek(0.030 / ORIG_D1).rotated(20, (1, 1, 0)).moved((0.01, -0.02, 0.005))
+    return {
+        "braunbek": braunbek(0.030 / ORIG_D1),
+        "3-axis braunbek": three_axis_braunbek((0.030 / ORIG_D1, 0.035 / ORIG_D1, 0.040 / ORIG_D1)),
+        "2d helmholtz": CoilSystem.concat(pair, pair.rotated(-90, "x")),
+        "tilted braunbek": tilted,
+        "reversed loop": braunbek(0.030 / ORIG_D1).copy(normal=[(0, 0, 1)] * 3 + [(0, 0, -1)]),
+    }
+
+
+@pytest.mark.parametrize("name", list(systems()))
+def test_symmetric_field_matches_loop_field(name):
+    system = systems()[name]
+    grid = np.mgrid[-0.05:0.05:21j, -0.05:0.05:21j, -0.05:0.05:21j].T.reshape(-1, 3)
+    expected = loop_field(**system.loops(), points=grid)
+    B = symmetric_field(**system.loops(), points=grid)
+    assert np.amax(np.abs(B - expected)) < 1e-12 * np.amax(np.abs(expected))
+
+
+def test_coaxial_sets_of_the_three_axis_set():
+    system = three_axis_braunbek((0.030 / ORIG_D1, 0.035 / ORIG_D1, 0.040 / ORIG_D1))
+    sets = coaxial_sets(**system.loops())
+    assert [sorted(s["index"]) for s in sets] == [list(range(i, i + 4)) for i in (0, 4, 8)]
+    # all three axes are mirror symmetric about the centre
+    assert all(s["mirror"] == pytest.approx(0, abs=1e-15) for s in sets)
+
+
+def test_mirror_needs_equal_currents():
+    system = braunbek(1.0).copy(current=[1, 1, 1, 2])
+    (s,) = coaxial_sets(**system.loops())
+    assert s["mirror"] is None
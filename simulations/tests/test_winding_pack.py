@@ -0,0 +1,52 @@
+import numpy as np
+
+from coilsystem import CoilSystem, helmholtz
+from winding_pack import WindingPack, pack_pair
+
+GRID = np.mgrid[0:0:1j, -0.08:0.08:21j, -0.08:0.08:21j].T.reshape(-1, 3)
+
+
+def relative(B, expected):
+    return np.amax(np.abs(B - expected)) / np.amax(np.abs(expected))
+
+
+def test_quadrature_matches_the_turns():
+    # a partially filled last layer included
+    for turns in (10, 100, 503):
+        pack = WindingPack(0.1, turns, 0.001, position=(0, 0, 0.05))
+        assert relative(pack.getB(GRID), pack.turns_system().getB(GRID)) < 1e-4
+
+
+def test_quadrature_converged():
+    # well below the difference of the current models above
+    pack = WindingPack(0.1, 500, 0.001, position=(0, 0, 0.05))
+    assert relative(pack.getB(GRID, order=4), pack.getB(GRID, order=8)) < 1e-5
+
+
+def test_total_current():
+    pack = WindingPack(0.1, 503, 0.001, current=2)
+    assert np.isclose(np.sum(pack.to_system(order=(3, 5)).current), 503 * 2, rtol=1e-12)
+
+
+def test_inner_radius_is_the_innermost_layer():
+    pack = WindingPack(0.05, 4, 0.001, radial_build=0.001)
+    turns = pack.turns_system()
+    assert np.isclose(turns.radius.min(), 0.05)
+    # the cross-section reaches half a layer pitch further in
+    assert turns.radius.min() - 0.00025 < pack.to_system().radius.min() < 0.05
+
+
+def test_layout_of_the_helmholtz_scripts():
+    # two layers growing by one wire diameter in diameter, wound from
+    # +/-D/4 towards +z like 2d_helmholtz.py
+    packs = [WindingPack(0.05, 4, 0.001, radial_build=0.001, position=(0, 0, side * 0.025 + 0.001))
+             for side in (1, -1)]
+    turns = CoilSystem.series(*(pack.turns_system() for pack in packs))
+    script = helmholtz(0.100)
+    key = lambda s: sorted(zip(np.round(s.radius, 9), np.round(s.position[:, 2], 9)))
+    assert key(turns) == key(script)
+
+    points = np.random.default_rng(0).uniform(-0.01, 0.01, (50, 3))
+    pair = pack_pair(0.05, 0.05, 4, 0.001, radial_build=0.001, offset=0.001)
+    assert relative(pair.getB(points), script.getB(points)) < 1e-4
+    assert pair.n_groups == 1
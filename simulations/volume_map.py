@@ -0,0 +1,107 @@
+import json
+import os
+
+import numpy as np
+
+# Volumetric field maps on a regular grid, written chunk by chunk into a
+# memory-mapped .npy file of shape (nx, ny, nz, 3).
+#
+# Next to the map a .json file holds the grid description and a .progress.npy
+# file one flag per chunk. A chunk is flagged only after its data has been
+# flushed, so an interrupted run picks up at the first unfinished chunk when
+# it is started again with the same arguments. Readers open the map with
+# np.load(mmap_mode="r") underneath and only touch the slices they index.
+
+
+def _paths(path):
+    base = path[:-4] if path.endswith(".npy") else path
+    return base + ".npy", base + ".json", base + ".progress.npy"
+
+
+def grid_axes(lower, upper, shape):
+    return [np.linspace(lo, hi, n) for lo, hi, n in zip(lower, upper, shape)]
+
+
+def write_volume_map(source, path, lower, upper, shape, chunk=1 << 18, dtype="float32",
+                     progress=None):
+    """Evaluate source.getB on a regular grid into the map at path.
+
+    lower, upper  grid corners [m], shape the number of points per axis
+    chunk         number of grid points evaluated at once, bounds the memory
+    progress      optional callback progress(done_chunks, total_chunks)
+
+    Resumes an existing map with the same grid, starts over otherwise.
+    Returns the opened VolumeMap.
+    """
+    data_path, meta_path, progress_path = _paths(path)
+    meta = dict(
+        lower=[float(v) for v in lower],
+        upper=[float(v) for v in upper],
+        shape=[int(n) for n in shape],
+        dtype=np.dtype(dtype).str,
+        chunk=int(chunk),
+    )
+    total = int(np.prod(meta["shape"]))
+    n_chunks = -(-total // chunk)
+
+    resume = False
+    if all(os.path.exists(p) for p in (data_path, meta_path, progress_path)):
+        with open(meta_path) as file:
+            resume = json.load(file) == meta
+    if resume:
+        data = np.lib.format.open_memmap(data_path, mode="r+")
+        done = np.lib.format.open_memmap(progress_path, mode="r+")
+    else:
+        data = np.lib.format.open_memmap(data_path, mode="w+", dtype=dtype, shape=(*meta["shape"], 3))
+        done = np.lib.format.open_memmap(progress_path, mode="w+", dtype=bool, shape=(n_chunks,))
+        done.flush()
+        with open(meta_path, "w") as file:
+            json.dump(meta, file)
+
+    flat = data.reshape(-1, 3)
+    axes = grid_axes(meta["lower"], meta["upper"], meta["shape"])
+    for k in np.flatnonzero(~done):
+        start, stop = k * chunk, min((k + 1) * chunk, total)
+        index = np.unravel_index(np.arange(start, stop), meta["shape"])
+        points = np.stack([axis[i] for axis, i in zip(axes, index)], axis=1)
+        flat[start:stop] = source.getB(points)
+        data.flush()
+        done[k] = True
+        done.flush()
+        if progress is not None:
+            progress(int(done.sum()), n_chunks)
+
+    del data, done
+    return VolumeMap(path)
+
+
+class VolumeMap:
+    """Read-only view of a map written by write_volume_map."""
+
+    def __init__(self, path):
+        data_path, meta_path, progress_path = _paths(path)
+        with open(meta_path) as file:
+            self.meta = json.load(file)
+        self.data = np.load(data_path, mmap_mode="r")
+        self.complete = bool(np.all(np.load(progress_path)))
+        self.lower = np.array(self.meta["lower"])
+        self.upper = np.array(self.meta["upper"])
+        self.shape = tuple(self.meta["shape"])
+        self.axes = grid_axes(self.lower, self.upper, self.shape)
+
+    def index(self, point):
+        """Grid index closest to point."""
+        return tuple(int(np.clip(np.rint((p - lo) / (hi - lo) * (n - 1)) if hi > lo else 0, 0, n - 1))
+                     for p, lo, hi, n in zip(point, self.lower, self.upper, self.shape))
+
+    def region(self, lower, upper):
+        """Axes and field of the sub-volume between lower and upper.
+
+        Only the indexed part of the file is read.
+        """
+        slices = []
+        for axis, lo, hi in zip(self.axes, lower, upper):
+            i0 = np.searchsorted(axis, lo, side="left")
+            i1 = np.searchsorted(axis, hi, side="right")
+            slices.append(slice(i0, i1))
+        return [axis[s] for axis, s in zip(self.axes, slices)], np.asarray(self.data[tuple(slices)])